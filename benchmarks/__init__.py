@@ -0,0 +1,6 @@
+"""
+Benchmarks measuring how parsing, assembly and solving of linear systems
+scale with the size and structure of the system
+
+Run with ``python3 -m benchmarks --help`` from the pivot source directory
+"""
@@ -0,0 +1,7 @@
+"""
+Entry point for running benchmarks with python3 -m benchmarks
+"""
+
+from benchmarks.runner import main
+
+main()
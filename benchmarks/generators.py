@@ -0,0 +1,128 @@
+"""
+Generators of random nonsingular equation sets with particular structures
+
+Every generator takes a number of variables and a random.Random instance and
+returns an EquationSet. Coefficients are small integers and every system is
+strictly diagonally dominant (or triangular) so it has a unique solution
+which the exact methods can find too.
+"""
+
+from pivot.interface.shortcuts import V
+from pivot.lexicon import equation
+from pivot.lexicon import expression
+
+
+def make_variables(size, prefix="v"):
+    """
+    Return a list of size Variables
+    """
+    return [expression.Variable("{}{}".format(prefix, index))
+            for index in range(size)]
+
+
+def total(terms):
+    """
+    Return an expression for the sum of a non-empty list of terms
+    """
+    if len(terms) == 1:
+        return terms[0]
+    return expression.sum_of(*terms)
+
+
+def dominant_equation(variables, row, columns, rng):
+    """
+    Return a diagonally dominant equation in the variable of a given row and
+    the variables of other columns with a random integer constant
+    """
+    coefficients = {column: rng.choice((-2, -1, 1, 2))
+                    for column in columns if column != row}
+    diagonal = sum(map(abs, coefficients.values())) + rng.randint(1, 3)
+    terms = [diagonal * variables[row]]
+    terms.extend(coefficient * variables[column]
+                 for column, coefficient in sorted(coefficients.items()))
+    return total(terms) == rng.randint(-9, 9)
+
+
+def dense_system(size, rng):
+    """
+    Return a system in which every equation contains every variable
+    """
+    variables = make_variables(size)
+    columns = range(size)
+    return equation.EquationSet(
+        dominant_equation(variables, row, columns, rng)
+        for row in range(size))
+
+
+def sparse_system(size, rng, per_row=3):
+    """
+    Return a system in which every equation contains its own variable and
+    per_row other randomly chosen variables
+    """
+    variables = make_variables(size)
+    return equation.EquationSet(
+        dominant_equation(variables, row,
+                          rng.sample(range(size), min(per_row, size)), rng)
+        for row in range(size))
+
+
+def block_diagonal_system(size, rng, block_size=5):
+    """
+    Return a system made of independent dense blocks of block_size variables
+    """
+    variables = make_variables(size)
+    return equation.EquationSet(
+        dominant_equation(variables, row,
+                          range(row - row % block_size,
+                                min(row - row % block_size + block_size,
+                                    size)), rng)
+        for row in range(size))
+
+
+def triangular_system(size, rng, per_row=2):
+    """
+    Return a chain of definitions in which each variable is defined in terms
+    of up to per_row earlier variables
+    """
+    variables = make_variables(size)
+    equations = []
+    for row in range(size):
+        terms = [
+            rng.choice((-2, -1, 1, 2)) * variables[column]
+            for column in sorted(rng.sample(range(row), min(per_row, row)))
+        ]
+        terms.append(rng.randint(-9, 9))
+        equations.append(variables[row] == total(terms))
+    return equation.EquationSet(equations)
+
+
+def planar_system(size, rng, per_row=2):
+    """
+    Return a sparse diagonally dominant system of equations between size
+    vector variables of the plane with constant vector right hand sides
+    """
+    variables = make_variables(size, "p")
+    equations = []
+    for row in range(size):
+        coefficients = {
+            column: rng.choice((-2, -1, 1, 2))
+            for column in rng.sample(range(size), min(per_row, size))
+            if column != row
+        }
+        diagonal = sum(map(abs, coefficients.values())) + rng.randint(1, 3)
+        terms = [diagonal * variables[row]]
+        terms.extend(coefficient * variables[column]
+                     for column, coefficient in sorted(coefficients.items()))
+        equations.append(
+            total(terms) == V(
+                rng.randint(-9, 9), rng.randint(-9, 9)))
+    return equation.EquationSet(equations)
+
+
+GENERATORS = {
+    'dense': dense_system,
+    'sparse': sparse_system,
+    'block': block_diagonal_system,
+    'triangular': triangular_system,
+    'planar': planar_system,
+}
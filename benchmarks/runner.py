@@ -0,0 +1,224 @@
+"""
+Run benchmarks over generated systems and report the time and peak memory
+of each stage of solving them as JSON
+"""
+
+import argparse
+import contextlib
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from benchmarks import generators
+from pivot.deduction import linear
+from pivot.ontology import matrix
+
+DEFAULT_SIZES = (10, 100, 1000)
+
+# the largest number of variables for which each method is run, beyond which
+# dense matrices or exact dense elimination become impractical
+MAXIMUM_SIZES = {
+    linear.SolutionMethod.BUILTIN: 100000,
+    linear.SolutionMethod.NUMPY: 5000,
+    linear.SolutionMethod.SPARSE: 100000,
+    linear.SolutionMethod.FRACTION_FREE: 200,
+    linear.SolutionMethod.LEAST_SQUARES: 2000,
+    linear.SolutionMethod.RANK_REVEALING: 200,
+    linear.SolutionMethod.MIXED_PRECISION: 2000,
+    linear.SolutionMethod.FIELD: 200,
+}
+
+# the largest system of every equation containing every variable which is
+# generated at all
+MAXIMUM_DENSE_SIZE = 1000
+
+# the largest system of each kind solved by the exact methods, beyond which
+# the fill-in of exact elimination makes it impractical (e.g. BUILTIN takes
+# over a minute on a sparse system of 1000 variables); kinds not listed are
+# only limited by MAXIMUM_SIZES
+MAXIMUM_EXACT_SIZES = {
+    'dense': 100,
+    'sparse': 300,
+    'planar': 1000,
+}
+
+# the largest system for which matrix.reduced_rows is measured
+MAXIMUM_REDUCED_ROWS_SIZE = 100
+
+EXACT_METHODS = (linear.SolutionMethod.BUILTIN,
+                 linear.SolutionMethod.FRACTION_FREE,
+                 linear.SolutionMethod.RANK_REVEALING,
+                 linear.SolutionMethod.FIELD)
+
+
+class StageTimer(object):
+    """
+    Records the wall time and, optionally, the peak memory allocated during
+    named stages of a benchmark
+    """
+
+    def __init__(self, memory=True):
+        self.memory = memory
+        self.stages = {}
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """
+        Time the body of a with statement as a named stage
+        """
+        if self.memory:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        yield
+        record = {'seconds': time.perf_counter() - start}
+        if self.memory:
+            record['peak_bytes'] = tracemalloc.get_traced_memory()[1] - \
+                baseline
+        self.stages[name] = record
+
+
+def skip_reason(kind, size, method):
+    """
+    Return why a case should not be run or None if it should be
+    """
+    if size > MAXIMUM_SIZES[method]:
+        return "larger than {} variables".format(MAXIMUM_SIZES[method])
+    if method in EXACT_METHODS and size > MAXIMUM_EXACT_SIZES.get(
+            kind, size):
+        return "{} and larger than {} variables".format(
+            kind, MAXIMUM_EXACT_SIZES[kind])
+    return None
+
+
+def run_case(kind, size, method, seed=0, memory=True):
+    """
+    Return a dict describing the stages of solving one generated system
+    with one method
+    """
+    result = {'kind': kind, 'size': size, 'method': method.name}
+    reason = skip_reason(kind, size, method)
+    if reason is not None:
+        result['skipped'] = reason
+        return result
+    engine = linear.PlanarEngine if kind == 'planar' else linear.LinearEngine
+    engine.compiled_systems.clear()
+    engine.parsed_equations.clear()
+    timer = StageTimer(memory)
+    with timer.stage('generate'):
+        eq_set = generators.GENERATORS[kind](size, random.Random(seed))
+    if kind == 'planar':
+        # the planar engine splits and solves in one call
+        with timer.stage('solve'):
+            engine.solve_equation_set(eq_set, method=method)
+    else:
+        with timer.stage('parse'):
+            equations, parsed = engine.canonical_equations(eq_set)
+            variables, entries, constants = engine.parse_equation_set(
+                equations, parsed)
+        with timer.stage('assemble'):
+            system = linear.LinearSystem(engine, equations, variables,
+                                         entries, constants)
+            if method == linear.SolutionMethod.SPARSE:
+                system.sparse_matrix  # pylint: disable=pointless-statement
+            elif method not in EXACT_METHODS:
+                system.dense_matrix  # pylint: disable=pointless-statement
+        with timer.stage('solve'):
+            system.solve(method)
+        if method == linear.SolutionMethod.BUILTIN \
+           and size <= MAXIMUM_REDUCED_ROWS_SIZE:
+            with timer.stage('reduced_rows'):
+                matrix.reduced_rows(system.rows)
+        result['terms'] = sum(map(len, entries))
+    result['stages'] = timer.stages
+    return result
+
+
+def run(kinds, sizes, methods, seed=0, memory=True, progress=None):
+    """
+    Return a report of every combination of kind, size and method
+    """
+    results = []
+    for method in methods:
+        # solve a tiny system first so lazy imports are not measured
+        run_case('sparse', 2, method, seed, memory=False)
+    if memory:
+        tracemalloc.start()
+    try:
+        for kind in kinds:
+            for size in sizes:
+                if kind == 'dense' and size > MAXIMUM_DENSE_SIZE:
+                    continue
+                for method in methods:
+                    result = run_case(kind, size, method, seed, memory)
+                    if progress is not None:
+                        progress(result)
+                    results.append(result)
+    finally:
+        if memory:
+            tracemalloc.stop()
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': seed,
+        'memory': memory,
+        'results': results,
+    }
+
+
+def report_progress(result):
+    """
+    Write a one line summary of a result to stderr
+    """
+    if 'skipped' in result:
+        summary = "skipped ({})".format(result['skipped'])
+    else:
+        summary = " ".join(
+            "{}={:.4f}s".format(name, stage['seconds'])
+            for name, stage in result['stages'].items())
+    print("{kind:>10} {size:>7} {method:<15} ".format(**result) + summary,
+          file=sys.stderr)
+
+
+def main(argv=None):
+    """
+    Run benchmarks from the command line
+    """
+    parser = argparse.ArgumentParser(
+        prog="python3 -m benchmarks", description=__doc__)
+    parser.add_argument(
+        '--kinds',
+        nargs='+',
+        default=sorted(generators.GENERATORS),
+        choices=sorted(generators.GENERATORS))
+    parser.add_argument(
+        '--sizes', nargs='+', type=int, default=list(DEFAULT_SIZES))
+    parser.add_argument(
+        '--methods',
+        nargs='+',
+        default=[method.name for method in linear.SolutionMethod],
+        choices=[method.name for method in linear.SolutionMethod])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument(
+        '--no-memory',
+        action='store_true',
+        help="do not trace memory (tracing slows every stage down)")
+    parser.add_argument(
+        '--output', help="file to write the JSON report to (default stdout)")
+    parser.add_argument('--quiet', action='store_true')
+    args = parser.parse_args(argv)
+    report = run(args.kinds,
+                 args.sizes,
+                 [linear.SolutionMethod[name] for name in args.methods],
+                 seed=args.seed,
+                 memory=not args.no_memory,
+                 progress=None if args.quiet else report_progress)
+    if args.output is None:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
@@ -0,0 +1,163 @@
+"""
+Tools for compiling expressions into python functions for fast repeated
+evaluation
+"""
+
+from pivot.lexicon import expression
+from pivot.ontology import plane
+
+
+class CompiledExpression(object):
+    """
+    One or more expressions compiled into a single flat python function of
+    the values of their variables
+
+    Each distinct subexpression is evaluated exactly once per call. Since
+    values are combined using plain arithmetic operators, calling the
+    function with numpy arrays of values evaluates the expressions for every
+    assignment in one vectorized pass.
+    """
+
+    # the most arguments of an n-ary operation combined in a single line,
+    # since compiling a longer chain of operators recurses too deeply
+    chunk_size = 256
+
+    def __init__(self, expressions, many=False):
+        self.expressions = list(expressions)
+        self.many = many
+        self.namespace = {'PlaneVector': plane.PlaneVector}
+        self.variables = set()
+        self.source = self.generate_source()
+        exec(compile(self.source, "<compiled expression>", "exec"),  # pylint: disable=exec-used
+             self.namespace)
+        self.function = self.namespace['evaluate']
+
+    def __call__(self, values):
+        """
+        Return the value of the expression (or a list of the values of the
+        expressions) given a dict mapping Variables to values
+        """
+        return self.function(values)
+
+    def bind(self, obj, prefix):
+        """
+        Return the name of a global bound to an object in the namespace of
+        the compiled function
+        """
+        name = "{}{}".format(prefix, len(self.namespace))
+        self.namespace[name] = obj
+        return name
+
+    def generate_source(self):
+        """
+        Return the source of a function evaluating the expressions, built by
+        walking their trees without recursion
+
+        Like evaluate_expression, the items of a Vector are only evaluated
+        when the vector itself is not given a value, so they are assigned in
+        a branch whose names are forgotten once the vector is assigned.
+        """
+        names = {}
+        lines = []
+        scopes = [[]]
+        stack = [(exp, False) for exp in reversed(self.expressions)]
+        while stack:
+            exp, expanded = stack.pop()
+            indent = "    " * len(scopes)
+            if expanded and isinstance(exp, expression.Vector):
+                lines.extend(indent + line for line in self.generate_lines(
+                    names[id(exp)], exp, names))
+                for key in scopes.pop():
+                    del names[key]
+                continue
+            if id(exp) in names:
+                continue
+            if not isinstance(exp, expression.Expression):
+                names[id(exp)] = self.bind(exp, "c")
+                continue
+            name = "t{}".format(len(lines))
+            if isinstance(exp, expression.Vector):
+                vector = self.bind(exp, "v")
+                lines.append("{}if {} in values:".format(indent, vector))
+                lines.append("{}    {} = values[{}]".format(
+                    indent, name, vector))
+                lines.append("{}else:".format(indent))
+                names[id(exp)] = name
+                scopes[-1].append(id(exp))
+                scopes.append([])
+                stack.append((exp, True))
+                stack.extend((item, False) for item in reversed(exp.items))
+                continue
+            if isinstance(exp, expression.OperationalExpression) \
+               and not expanded:
+                stack.append((exp, True))
+                stack.extend(
+                    (child, False) for child in reversed(exp.arguments))
+                continue
+            lines.extend(indent + line
+                         for line in self.generate_lines(name, exp, names))
+            names[id(exp)] = name
+            scopes[-1].append(id(exp))
+        if self.many:
+            result = "[{}]".format(", ".join(
+                names[id(exp)] for exp in self.expressions))
+        else:
+            result = names[id(self.expressions[0])]
+        return "def evaluate(values):\n{}\n    return {}\n".format(
+            "\n".join(lines), result)
+
+    def generate_lines(self, name, exp, names):
+        """
+        Return the lines assigning a node to a name, accumulating the
+        arguments of a long n-ary operation over several lines (evaluated
+        left to right, just as a single line would be)
+        """
+        if not isinstance(exp, expression.OperationalExpression) \
+           or len(exp.arguments) <= self.chunk_size:
+            return ["{} = {}".format(name, self.generate_line(exp, names))]
+        delimiter = " {} ".format(exp.operator)
+        arguments = [names[id(argument)] for argument in exp.arguments]
+        lines = ["{} = ({})".format(
+            name, delimiter.join(arguments[:self.chunk_size]))]
+        for start in range(self.chunk_size, len(arguments), self.chunk_size):
+            lines.append("{} = ({})".format(name, delimiter.join(
+                [name] + arguments[start:start + self.chunk_size])))
+        return lines
+
+    def generate_line(self, exp, names):
+        """
+        Return the python expression computing a node whose children have
+        already been assigned names (for a Vector, the vector of its items)
+        """
+        if isinstance(exp, expression.Variable):
+            if isinstance(exp, expression.VariableAttribute) \
+               and exp.attr_name in ('x', 'y'):
+                self.variables.add(exp.variable)
+                return "values[{}].{}".format(
+                    self.bind(exp.variable, "v"), exp.attr_name)
+            self.variables.add(exp)
+            return "values[{}]".format(self.bind(exp, "v"))
+        elif isinstance(exp, expression.OperationalExpression):
+            delimiter = " {} ".format(exp.operator)
+            return "({})".format(
+                delimiter.join(names[id(argument)]
+                               for argument in exp.arguments))
+        elif isinstance(exp, expression.Vector):
+            items = "".join(names[id(item)] + ", " for item in exp.items)
+            return "PlaneVector(({}))".format(items)
+        else:
+            raise TypeError(type(exp))
+
+
+class CompiledResiduals(CompiledExpression):
+    """
+    The differences between the sides of each equation of an equation set
+    compiled into a function returning them as a list (in the order of the
+    equations attribute)
+    """
+
+    def __init__(self, equations):
+        self.equations = list(equations)
+        super().__init__(
+            [equation.subj - equation.obj for equation in self.equations],
+            many=True)
@@ -2,12 +2,19 @@
 Linear deduction engine and related tools
 """
 
+import collections
 import enum
+import fractions
+import functools
 import itertools
 import operator
+import threading
+import warnings
 
+from pivot.deduction.evaluation import CompiledExpression, CompiledResiduals
 from pivot.interface.deducer import SolvingEngine
 from pivot.lexicon import expression
+from pivot.ontology import field
 from pivot.ontology import matrix
 from pivot.ontology import plane
 
@@ -25,21 +32,28 @@ class SolutionMethod(enum.Enum):
     """
     BUILTIN = 0
     NUMPY = 1
+    SPARSE = 2
+    FRACTION_FREE = 3
+    LEAST_SQUARES = 4
+    RANK_REVEALING = 5
+    MIXED_PRECISION = 6
+    FIELD = 7
 
 
 class SumOfProducts(object):
     """
     Models an expression that is the sum of products of primitives
     """
-    # TODO should have field attribute instead
-    # TODO alternatively should be able to get
-    # additive and multiplicate identity just by
-    # subtracting and dividing coefficient from itself
-    mult_identity = 1
-    add_identity = 0
+    # the field of parsed coefficients which supplies their identities
+    # (the multiplicative identity also keys the constant term)
+    coefficient_field = field.RATIONALS
+    mult_identity = coefficient_field.one
+    add_identity = coefficient_field.zero
+    # expressions which are kept whole as the efficients of terms
+    term_types = (expression.Variable, )
 
-    def __init__(self, coefficients):
-        self.coefficients = coefficients
+    def __init__(self, coefficients=None):
+        self.coefficients = {} if coefficients is None else coefficients
 
     @classmethod
     def from_expression(cls, exp):
@@ -48,37 +62,145 @@ class SumOfProducts(object):
         """
         if not isinstance(exp, expression.Expression):
             return cls({cls.mult_identity: exp})
-        elif isinstance(exp, expression.Variable):
+        elif isinstance(exp, cls.term_types):
             return cls({exp: cls.mult_identity})
         elif isinstance(exp, expression.OperationalExpression):
-            return OPERATOR_MAP[exp.operator](
-                *list(map(cls.from_expression, exp.arguments)))
+            operands = map(cls.from_expression, exp.arguments)
+            if exp.operator == '+':
+                return cls.sum(operands)
+            return functools.reduce(OPERATOR_MAP[exp.operator], operands)
         else:
             raise TypeError(type(exp))
 
+    @classmethod
+    def linearize(cls, exp):
+        """
+        Create a SumOfProducts from an Expression in a single non-recursive
+        pass over the expression tree
+        """
+        sop = cls()
+        sop.accumulate(exp)
+        return sop
+
+    @classmethod
+    def sum(cls, terms):
+        """
+        Return the sum of an iterable of SumOfProducts accumulated into a
+        single dict of coefficients
+        """
+        total = cls()
+        for term in terms:
+            total += term
+        return total
+
     @classmethod
     def multiply_efficients(cls, eff0, eff1):
         """
         Multiply two multiplicands and reduce
         """
-        if eff0 == cls.mult_identity:
+        # only the identity itself is skipped (multiplying by e.g. 1.0 still
+        # makes a float)
+        identity_type = type(cls.mult_identity)
+        if type(eff0) is identity_type and eff0 == cls.mult_identity:
             return eff1
 
-        if eff1 == cls.mult_identity:
+        if type(eff1) is identity_type and eff1 == cls.mult_identity:
             return eff0
         return eff0 * eff1
 
-    def __add__(self, other):
-        coefficients = {}
-        all_coefficients = itertools.chain(self.coefficients.items(),
-                                           other.coefficients.items())
-        for efficient, coefficient in all_coefficients:
-            if efficient in coefficients:
-                coefficients[efficient] += coefficient
+    def add_term(self, efficient, coefficient):
+        """
+        Add a coefficient times an efficient to the SumOfProducts in place
+        """
+        coefficients = self.coefficients
+        if efficient in coefficients:
+            coefficients[efficient] = coefficients[efficient] + coefficient
+        else:
+            coefficients[efficient] = coefficient
+
+    def add_scaled(self, other, scale):
+        """
+        Add a multiple of another SumOfProducts to this one in place
+        """
+        for efficient, coefficient in other.coefficients.items():
+            self.add_term(efficient,
+                          self.multiply_efficients(scale, coefficient))
+        return self
+
+    def accumulate(self, exp, scale=None):
+        """
+        Add a multiple (by default one) of an Expression to the
+        SumOfProducts in place
+
+        Linear subexpressions are walked once with an explicit stack,
+        carrying the product of the constants applied to them as a scale, so
+        each term is added straight into the coefficients without building
+        an intermediate SumOfProducts
+        """
+        if scale is None:
+            scale = self.mult_identity
+        stack = [(exp, scale)]
+        while stack:
+            exp, scale = stack.pop()
+            if not isinstance(exp, expression.Expression):
+                self.add_term(self.mult_identity,
+                              self.multiply_efficients(scale, exp))
+            elif isinstance(exp, self.term_types):
+                self.add_term(exp, scale)
+            elif not isinstance(exp, expression.OperationalExpression):
+                self.add_scaled(self.from_expression(exp), scale)
+            elif exp.operator == '+':
+                # pushed in reverse so terms are added from left to right
+                stack.extend(
+                    (argument, scale) for argument in reversed(exp.arguments))
+            elif exp.operator == '-':
+                stack.append((exp.arguments[1], -scale))
+                stack.append((exp.arguments[0], scale))
+            elif exp.operator == '*':
+                subexpressions = [
+                    argument for argument in exp.arguments
+                    if isinstance(argument, expression.Expression)
+                ]
+                if len(subexpressions) != 1:
+                    self.add_scaled(self.from_expression(exp), scale)
+                    continue
+                for argument in exp.arguments:
+                    if argument is not subexpressions[0]:
+                        scale = self.multiply_efficients(scale, argument)
+                stack.append((subexpressions[0], scale))
+            elif exp.operator == '/' and not isinstance(
+                    exp.arguments[1], expression.Expression):
+                stack.append((exp.arguments[0],
+                              matrix.divide(scale, exp.arguments[1])))
             else:
-                coefficients[efficient] = coefficient
+                self.add_scaled(self.from_expression(exp), scale)
+        for efficient, coefficient in self.coefficients.items():
+            # rational scales may leave whole coefficients as Fractions
+            if isinstance(coefficient, fractions.Fraction) \
+               and coefficient.denominator == 1:
+                self.coefficients[efficient] = coefficient.numerator
+        return self
 
-        return type(self)(coefficients)
+    def copy(self):
+        """
+        Return a copy of the SumOfProducts
+        """
+        return type(self)(dict(self.coefficients))
+
+    def __iadd__(self, other):
+        for efficient, coefficient in other.coefficients.items():
+            self.add_term(efficient, coefficient)
+        return self
+
+    def __isub__(self, other):
+        for efficient, coefficient in other.coefficients.items():
+            self.add_term(efficient, -coefficient)
+        return self
+
+    def __add__(self, other):
+        result = self.copy()
+        result += other
+        return result
 
     def __neg__(self):
         return type(self)({
@@ -87,7 +209,9 @@ class SumOfProducts(object):
         })
 
     def __sub__(self, other):
-        return self + (-other)
+        result = self.copy()
+        result -= other
+        return result
 
     def __mul__(self, other):
         coefficients = {}
@@ -107,15 +231,229 @@ class SumOfProducts(object):
         })
 
 
+class VectorSumOfProducts(SumOfProducts):
+    """
+    A SumOfProducts whose terms may be Vector expressions as well as
+    Variables, so that an expression like 2 * p + V(1, 2) is parsed into
+    the coefficients of the vector variable p and the constant vector
+    """
+    term_types = (expression.Variable, expression.Vector)
+
+
+class LRUCache(object):
+    """
+    A mapping of bounded size which evicts its least recently used entries
+
+    If maxcost is given the total cost of the entries (as given to put) is
+    bounded too and entries costing more than maxcost are never cached
+    """
+
+    def __init__(self, maxsize, maxcost=None):
+        self.maxsize = maxsize
+        self.maxcost = maxcost
+        self.entries = collections.OrderedDict()
+        self.costs = {}
+        self.total_cost = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key, default=None):
+        """
+        Return the value for a key (marking it as recently used) or a
+        default if the key is not cached
+        """
+        with self.lock:
+            if key not in self.entries:
+                return default
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+    def put(self, key, value, cost=1):
+        """
+        Cache a value for a key, evicting the least recently used entries
+        while the cache is full
+        """
+        with self.lock:
+            if key in self.entries:
+                self.total_cost -= self.costs.pop(key)
+                del self.entries[key]
+            if self.maxcost is not None and cost > self.maxcost:
+                return
+            self.entries[key] = value
+            self.costs[key] = cost
+            self.total_cost += cost
+            while len(self.entries) > self.maxsize or (
+                    self.maxcost is not None
+                    and self.total_cost > self.maxcost):
+                evicted, _ = self.entries.popitem(last=False)
+                self.total_cost -= self.costs.pop(evicted)
+
+    def clear(self):
+        """
+        Remove all entries from the cache
+        """
+        with self.lock:
+            self.entries.clear()
+            self.costs.clear()
+            self.total_cost = 0
+
+
+def equation_key(equation):
+    """
+    Return the key under which a parsed or compiled equation is cached
+
+    Equations compare equal whenever their constants do (e.g. 1 and 1.0) so
+    the interning keys of their sides, which tell such constants apart, are
+    included (the equation itself keeps the interned sides alive)
+    """
+    return (equation, expression.interning_key(equation.subj),
+            expression.interning_key(equation.obj))
+
+
 class LinearEngine(SolvingEngine):
     """
     Deduction engine for solving linear systems
     """
     parsed_expression_class = SumOfProducts
+    # the field in which systems are solved by the FIELD method (subclasses
+    # may set e.g. field.PrimeField(2) to solve systems over GF(2))
+    field = field.RATIONALS
+    # compiled systems are keyed on the (structurally hashed) set of their
+    # equations and parsed equations on the equations themselves so that
+    # identical and near-identical systems share work. Since cached entries
+    # keep their expression trees (and compiled systems their matrices,
+    # factorizations and solutions) alive both caches are also bounded by
+    # the total number of terms they hold.
+    compiled_systems = LRUCache(128, maxcost=10**6)
+    parsed_equations = LRUCache(4096, maxcost=10**6)
+
+    @classmethod
+    def parse_equation(cls, equation):
+        """
+        Return the coefficients of the SumOfProducts equal to the difference
+        of both sides of an equation
+        """
+        key = (cls, equation_key(equation))
+        coefficients = cls.parsed_equations.get(key)
+        if coefficients is None:
+            parsed = cls.parsed_expression_class.linearize(equation.subj)
+            parsed.accumulate(equation.obj,
+                              -cls.parsed_expression_class.mult_identity)
+            coefficients = parsed.coefficients
+            cls.parsed_equations.put(key, coefficients, len(coefficients))
+        return coefficients
+
+    @classmethod
+    def parse_equation_set(cls, eq_set, parsed=None):
+        """
+        Return the variables of a linear system along with a list of dicts
+        (one per equation) mapping column indices to coefficients and a list
+        of the constants of each equation
+
+        Equations already parsed (e.g. by canonical_equations) are not
+        parsed again if their coefficients are given in the same order
+        """
+        mult_identity = cls.parsed_expression_class.mult_identity
+        add_identity = cls.parsed_expression_class.add_identity
+        variables = []
+        columns = {}
+        entries = []
+        augmentations = []
+        if parsed is None:
+            parsed = map(cls.parse_equation, eq_set)
+        for coefficients in parsed:
+            augmentations.append(-coefficients.get(mult_identity,
+                                                   add_identity))
+            entry = {}
+            for variable, coefficient in coefficients.items():
+                if not isinstance(variable, expression.Expression):
+                    continue
+                if variable not in columns:
+                    columns[variable] = len(variables)
+                    variables.append(variable)
+                entry[columns[variable]] = coefficient
+            entries.append(entry)
+        return variables, entries, augmentations
+
+    @classmethod
+    def canonical_equations(cls, eq_set):
+        """
+        Return the equations of a set in a canonical order which does not
+        depend on the iteration order of the set, along with a list of
+        their coefficients (see parse_equation) in the same order
+
+        Equations are parsed (without recursing through their expressions)
+        and ordered by their coefficients and constants, with columns
+        ordered by the attr_chains of their variables
+        """
+        parsed = [(equation, cls.parse_equation(equation))
+                  for equation in eq_set]
+        terms = {
+            term
+            for _, coefficients in parsed for term in coefficients
+            if isinstance(term, expression.Expression)
+        }
+        columns = {
+            term: column
+            for column, term in enumerate(sorted(terms, key=term_order))
+        }
+        constant_key = cls.parsed_expression_class.mult_identity
+
+        def row_order(item):
+            coefficients = item[1]
+            row = sorted((columns[term], repr(coefficient))
+                         for term, coefficient in coefficients.items()
+                         if isinstance(term, expression.Expression))
+            return row, repr(coefficients.get(constant_key))
+
+        parsed.sort(key=row_order)
+        return ([equation for equation, _ in parsed],
+                [coefficients for _, coefficients in parsed])
 
-    # TODO refactor
     @classmethod
-    def solve_equation_set(cls, eq_set, method=SolutionMethod.NUMPY):  # pylint: disable=R0914
+    def compile_equation_set(cls, eq_set):
+        """
+        Parse an equation set once into a LinearSystem which can then be
+        factorized and solved for many different constants
+
+        Compiled systems are cached so compiling a structurally identical
+        equation set again returns the same LinearSystem. Equations are
+        ordered canonically (by their representations) so that the order of
+        the rows and columns of the system, and so its solutions, do not
+        depend on the iteration order of the set (see canonical_equations).
+        """
+        key = (cls, frozenset(map(equation_key, eq_set)))
+        system = cls.compiled_systems.get(key)
+        if system is None:
+            with cls.stage('parse'):
+                equations, parsed = cls.canonical_equations(eq_set)
+                variables, entries, augmentations = cls.parse_equation_set(
+                    equations, parsed)
+            system = LinearSystem(cls, equations, variables, entries,
+                                  augmentations)
+            cls.compiled_systems.put(key, system, system.cost)
+            cls.add_counts(
+                equations=len(equations),
+                variables=len(variables),
+                nonzeros=sum(map(len, entries)))
+        else:
+            cls.add_counts(cache_hits=1)
+        return system
+
+    @classmethod
+    def solve_equation_set(cls,
+                           eq_set,
+                           method=SolutionMethod.NUMPY,
+                           verify=False,
+                           tolerance=1e-9,
+                           decompose=True,
+                           executor=None,
+                           substitute=True):
         """
         Return the solutions of a linear system as a dict mapping
         Variables to values
@@ -125,73 +463,1607 @@ class LinearEngine(SolvingEngine):
           - NUMPY: solve using numpy. This will convert all constants
                    to floats so it is only recommended if you are not
                    using a custom field
+          - SPARSE: solve using scipy's sparse direct solver. Like NUMPY
+                    this converts all constants to floats but never builds
+                    a dense matrix so it is well suited to large systems
+                    with few terms per equation
           - BUILTN: works with custom fields but is buggy so use with
                     caution
+          - FRACTION_FREE: exact solution of systems with integer or
+                           rational coefficients using fraction-free
+                           (Bareiss) elimination over the integers
+          - LEAST_SQUARES: solve systems of any shape using numpy's SVD,
+                           returning a ParametricSolution with the
+                           minimum norm least squares solution
+          - RANK_REVEALING: solve systems of any shape exactly using
+                            rank-revealing elimination, returning a
+                            ParametricSolution (overdetermined systems
+                            with no solution are solved in the least
+                            squares sense)
+          - MIXED_PRECISION: solve in floating point and iteratively refine
+                             the solution using exact residuals, returning
+                             rationals when they solve the system exactly
+                             (see LinearSystem.solve_mixed_precision)
+          - FIELD: solve in the field of the engine (e.g. GF(p) using
+                   vectorized modular arithmetic) after converting every
+                   coefficient into it (see pivot.ontology.field)
+
+        If verify is True the residuals of NUMPY and SPARSE solutions are
+        checked and the solutions are iteratively refined if any residual
+        exceeds the tolerance
+
+        If decompose is True (and the method finds unique solutions) the
+        system is split into independent components which share no
+        variables and each is solved separately, in parallel if an executor
+        (e.g. a concurrent.futures.ThreadPoolExecutor) is given
+
+        If substitute is True square systems solved by BUILTIN, NUMPY,
+        SPARSE, FRACTION_FREE or FIELD are first peeled into chains of
+        definitions which are solved by substitution, leaving only their
+        coupled core to be solved by elimination (see LinearSystem.peel)
+
+        The time spent in each stage of the solve along with counts of
+        equations, variables, nonzeros and fill-in are gathered as
+        SolveStats while in pivot.interface.deducer.collect_stats or when
+        stats hooks are registered (see SolvingEngine)
+        """
+        with cls.instrumented():
+            return cls.compile_equation_set(eq_set).solve(
+                method,
+                verify=verify,
+                tolerance=tolerance,
+                decompose=decompose,
+                executor=executor,
+                substitute=substitute)
+
+    @classmethod
+    def solve_many(cls,
+                   eq_sets,
+                   method=SolutionMethod.NUMPY,
+                   executor=None,
+                   max_workers=None,
+                   chunksize=1):
+        """
+        Return a list of the solutions of many independent equation sets
+        solved in parallel in a process pool (by default a new
+        concurrent.futures.ProcessPoolExecutor with max_workers processes)
+
+        Equation sets are parsed in this process and only the compact
+        coefficient form of each system is sent to the workers, so
+        expression trees are never pickled
+        """
+        with cls.instrumented():
+            systems = [
+                cls.compile_equation_set(eq_set) for eq_set in eq_sets
+            ]
+            compact_systems = [system.compact() for system in systems]
+            methods = itertools.repeat(method, len(systems))
+            with cls.stage('parallel'):
+                if executor is None:
+                    from concurrent.futures import ProcessPoolExecutor
+                    with ProcessPoolExecutor(max_workers) as pool:
+                        results = list(
+                            pool.map(
+                                solve_compact,
+                                compact_systems,
+                                methods,
+                                chunksize=chunksize))
+                else:
+                    results = list(
+                        executor.map(solve_compact, compact_systems,
+                                     methods))
+        return [
+            system.relabel(result) for system, result in zip(systems, results)
+        ]
+
+    @classmethod
+    def verify_solution(cls, eq_set, solutions):
+        """
+        Return a Verification of how well solutions (a dict mapping Variables
+        to values) satisfy the equations of an equation set
+        """
+        return cls.compile_equation_set(eq_set).verify(solutions)
+
+    @classmethod
+    def dense_rows(cls, entries, augmentations, width):
+        """
+        Return the rows of the augmented matrix of a parsed linear system
         """
-        mult_identity = cls.parsed_expression_class.mult_identity
         add_identity = cls.parsed_expression_class.add_identity
-        variables = []
-        matrix_entries = []
-        augmentations = []
-        for equation in eq_set:
-            coefficients = cls.parsed_expression_class.from_expression(
-                equation.subj - equation.obj).coefficients
-            augmentations.append(-coefficients.get(mult_identity,
-                                                   add_identity))
-            old_variables = set(variables + [mult_identity])
-            variables.extend(set(coefficients) - old_variables)
-            matrix_entries.append([
-                coefficients.get(variable, add_identity)
-                for variable in variables
-            ])
         rows = []
-        for index, entry in enumerate(matrix_entries):
-            zeroes = [add_identity] * (len(variables) - len(entry))
-            rows.append(entry + zeroes + [augmentations[index]])
+        for entry, augmentation in zip(entries, augmentations):
+            row = [add_identity] * (width + 1)
+            for column, coefficient in entry.items():
+                row[column] = coefficient
+            row[width] = augmentation
+            rows.append(row)
+        return rows
+
+    @staticmethod
+    def triplets(entries):
+        """
+        Return arrays of the row indices, column indices and (float) values
+        of the nonzero coefficients of a parsed linear system
+        """
+        from numpy import arange, fromiter, intp, repeat
+        sizes = fromiter(map(len, entries), intp, len(entries))
+        count = int(sizes.sum())
+        row_indices = repeat(arange(len(entries)), sizes)
+        column_indices = fromiter(
+            itertools.chain.from_iterable(entries), intp, count)
+        values = fromiter(
+            itertools.chain.from_iterable(entry.values()
+                                          for entry in entries), float, count)
+        return row_indices, column_indices, values
+
+
+def term_order(term):
+    """
+    Return a key ordering the terms of parsed equations: variables by their
+    attr_chains followed by any other terms
+    """
+    if isinstance(term, expression.Variable):
+        return (0, term.attr_chain)
+    return (1, repr(term))
+
+
+# methods whose solutions are the union of the solutions of the independent
+# components of a system
+DECOMPOSABLE_METHODS = (
+    SolutionMethod.BUILTIN,
+    SolutionMethod.NUMPY,
+    SolutionMethod.SPARSE,
+    SolutionMethod.FRACTION_FREE,
+    SolutionMethod.MIXED_PRECISION,
+    SolutionMethod.FIELD,
+)
+
+
+def solve_compact(compact, method):
+    """
+    Solve a LinearSystem given in compact form returning solutions keyed by
+    column index (used to solve systems in other processes)
+    """
+    return LinearSystem.from_compact(compact).solve(method)
+
+
+class ParametricSolution(dict):
+    """
+    A particular solution of a linear system (a dict mapping Variables to
+    values) along with directions (also dicts mapping Variables to values)
+    in which it may be moved while remaining a solution
+    """
+
+    def __init__(self, particular, directions=(), free_variables=()):
+        super().__init__(particular)
+        self.directions = list(directions)
+        self.free_variables = list(free_variables)
+
+    @property
+    def determined(self):
+        """
+        Return whether the solution is unique
+        """
+        return not self.directions
+
+    def copy(self):
+        """
+        Return a copy of the particular solution along with its directions
+        and free variables
+        """
+        return type(self)(self, self.directions, self.free_variables)
+
+    def at(self, *parameters):
+        """
+        Return the solution found by moving the particular solution by the
+        given multiple of each direction
+        """
+        if len(parameters) != len(self.directions):
+            raise ValueError("Expected {} parameters".format(
+                len(self.directions)))
+        solution = dict(self)
+        for parameter, direction in zip(parameters, self.directions):
+            for variable, value in direction.items():
+                solution[variable] = solution[variable] + parameter * value
+        return solution
+
+
+class Verification(object):
+    """
+    The residuals of a solution of a LinearSystem (i.e. the differences
+    between the left and right hand sides of each of its equations)
+    """
+
+    def __init__(self, equations, residuals):
+        self.equations = equations
+        self.residuals = residuals
+
+    @property
+    def max_residual(self):
+        """
+        Return the largest absolute residual
+        """
+        return float(abs(self.residuals).max(initial=0))
+
+    @property
+    def norm(self):
+        """
+        Return the euclidean norm of the residuals
+        """
+        from numpy.linalg import norm
+        return float(norm(self.residuals))
+
+    @property
+    def by_equation(self):
+        """
+        Return a dict mapping each equation to its residual
+        """
+        return dict(zip(self.equations, self.residuals))
+
+    def satisfied(self, tolerance=1e-9):
+        """
+        Return whether every residual is within a tolerance of zero
+        """
+        return self.max_residual <= tolerance
+
+
+class LinearSystem(object):
+    """
+    A linear system parsed into the coefficients of an ordered list of
+    equations over an ordered list of variables
+
+    The float coefficient matrices, factorizations and solutions of the
+    system are computed lazily and cached
+    """
+
+    def __init__(self, engine, equations, variables, entries, constants):
+        self.engine = engine
+        self.equations = equations
+        self.variables = variables
+        self.entries = entries
+        self.constants = constants
+        self._dense_matrix = None
+        self._sparse_matrix = None
+        self._factorizations = {}
+        self._solutions = {}
+        self._components = None
+        self._component_rows = None
+        self._triangular_structure = None
+        self._fill_reducing_order = None
+        self._field_system = None
+
+    @property
+    def shape(self):
+        """
+        Return the number of equations and number of variables
+        """
+        return len(self.equations), len(self.variables)
+
+    @property
+    def cost(self):
+        """
+        Return the number of terms (coefficients and constants) of the
+        equations of the system, by which its compiled form is cached
+        """
+        return len(self.equations) + sum(map(len, self.entries))
+
+    @property
+    def dense_matrix(self):
+        """
+        Return the coefficient matrix as a dense numpy array of floats
+        """
+        if self._dense_matrix is None:
+            from numpy import zeros
+            with self.engine.stage('assemble'):
+                row_indices, column_indices, values = self.engine.triplets(
+                    self.entries)
+                self._dense_matrix = zeros(self.shape)
+                self._dense_matrix[row_indices, column_indices] = values
+        return self._dense_matrix
+
+    @property
+    def sparse_matrix(self):
+        """
+        Return the coefficient matrix as a scipy CSR matrix of floats
+        """
+        if self._sparse_matrix is None:
+            from scipy.sparse import coo_matrix
+            with self.engine.stage('assemble'):
+                row_indices, column_indices, values = self.engine.triplets(
+                    self.entries)
+                self._sparse_matrix = coo_matrix(
+                    (values, (row_indices, column_indices)),
+                    shape=self.shape).tocsr()
+        return self._sparse_matrix
+
+    @property
+    def float_constants(self):
+        """
+        Return the constants of the system as a numpy array of floats
+        """
+        from numpy import fromiter
+        with self.engine.stage('convert'):
+            return fromiter(self.constants, float, len(self.constants))
+
+    def float_columns(self, columns):
+        """
+        Return a 2d numpy array of floats with one column for each list of
+        constants (ordered like the equations of the system)
+        """
+        from numpy import array
+        with self.engine.stage('convert'):
+            return array(columns, dtype=float).reshape(
+                len(columns), len(self.equations)).T
+
+    @property
+    def rows(self):
+        """
+        Return the rows of the augmented matrix of the system
+        """
+        return self.engine.dense_rows(self.entries, self.constants,
+                                      len(self.variables))
+
+    def augmented_rows(self, columns):
+        """
+        Return the rows of the coefficient matrix of the system augmented
+        with several columns of constants (each ordered like its equations)
+        """
+        rows = self.engine.dense_rows(self.entries, self.constants,
+                                      len(self.variables))
+        for row, constants in zip(rows, zip(*columns)):
+            row[-1:] = constants
+        return rows
+
+    def solve(self,
+              method=SolutionMethod.NUMPY,
+              verify=False,
+              tolerance=1e-9,
+              decompose=True,
+              executor=None,
+              substitute=True):
+        """
+        Return the solutions of the system as a dict mapping Variables to
+        values (see LinearEngine.solve_equation_set)
+        """
+        # solutions found with different options may differ (e.g. by
+        # rounding) so each combination is cached separately
+        key = (method, decompose, substitute)
+        if key not in self._solutions and decompose \
+           and method in DECOMPOSABLE_METHODS and len(self.components) > 1:
+            solve_component = functools.partial(
+                LinearSystem.solve,
+                method=method,
+                decompose=False,
+                substitute=substitute)
+            solutions = {}
+            results = map(solve_component, self.components) \
+                if executor is None \
+                else executor.map(solve_component, self.components)
+            for component_solutions in results:
+                solutions.update(component_solutions)
+            self._solutions[key] = solutions
+        if key not in self._solutions:
+            if method == SolutionMethod.LEAST_SQUARES:
+                with self.engine.stage('eliminate'):
+                    self._solutions[key] = self._solve_least_squares()
+            elif method == SolutionMethod.RANK_REVEALING:
+                with self.engine.stage('eliminate'):
+                    self._solutions[key] = self._solve_rank_revealing()
+            elif method == SolutionMethod.MIXED_PRECISION:
+                with self.engine.stage('eliminate'):
+                    self._solutions[key] = self.solve_mixed_precision()
+            else:
+                self._solutions[key] = dict(
+                    zip(self.variables, self._solve(method, substitute)))
+        if verify and method in (SolutionMethod.NUMPY, SolutionMethod.SPARSE):
+            with self.engine.stage('verify'):
+                verification = self.verify(self._solutions[key])
+            if not verification.satisfied(tolerance):
+                with self.engine.stage('refine'):
+                    self._solutions[key] = self.refine(
+                        self._solutions[key], method, tolerance)
+        return self._solutions[key].copy()
+
+    def solve_columns(self,
+                      columns,
+                      method=SolutionMethod.NUMPY,
+                      verify=False,
+                      tolerance=1e-9,
+                      decompose=True,
+                      substitute=True):
+        """
+        Return a list of solution vectors of the system (ordered like its
+        variables), one for each of several columns of constants (ordered
+        like its equations), eliminating its coefficients only once
 
+        Only the methods finding unique solutions by elimination (BUILTIN,
+        NUMPY, SPARSE, FRACTION_FREE and FIELD) are supported and the other
+        options are those of LinearEngine.solve_equation_set
+        """
+        if decompose and len(self.components) > 1:
+            positions = {
+                variable: column
+                for column, variable in enumerate(self.variables)
+            }
+            vectors = [[None] * len(self.variables) for _ in columns]
+            for component, indices in zip(self.components,
+                                          self.component_rows):
+                component_vectors = component.solve_columns(
+                    [[column[index] for index in indices]
+                     for column in columns],
+                    method,
+                    verify=verify,
+                    tolerance=tolerance,
+                    decompose=False,
+                    substitute=substitute)
+                for vector, component_vector in zip(vectors,
+                                                    component_vectors):
+                    for variable, value in zip(component.variables,
+                                               component_vector):
+                        vector[positions[variable]] = value
+            return vectors
+        vectors = self._solve_columns(method, columns, substitute)
+        if verify and method in (SolutionMethod.NUMPY, SolutionMethod.SPARSE):
+            for position, constants in enumerate(columns):
+                solutions = dict(zip(self.variables, vectors[position]))
+                with self.engine.stage('verify'):
+                    verification = self.verify(solutions, constants)
+                if not verification.satisfied(tolerance):
+                    with self.engine.stage('refine'):
+                        vectors[position] = self.solution_vector(
+                            self.refine(solutions, method, tolerance,
+                                        constants=constants))
+        return vectors
+
+    def compact(self):
+        """
+        Return a compact picklable form of the system consisting only of its
+        engine, coefficients and constants
+        """
+        return (self.engine, self.entries, self.constants,
+                len(self.variables))
+
+    @classmethod
+    def from_compact(cls, compact):
+        """
+        Return a LinearSystem from its compact form, whose variables are the
+        column indices of the original system and whose equations are
+        unknown
+        """
+        engine, entries, constants, width = compact
+        return cls(engine, [None] * len(entries), list(range(width)), entries,
+                   constants)
+
+    def relabel(self, solutions):
+        """
+        Return solutions to the compact form of the system (keyed by column
+        index) keyed by the variables of the system instead
+        """
+        relabeled = {
+            self.variables[column]: value
+            for column, value in solutions.items()
+        }
+        if isinstance(solutions, ParametricSolution):
+            relabeled = ParametricSolution(relabeled, [
+                self.relabel(direction) for direction in solutions.directions
+            ], [self.variables[column] for column in solutions.free_variables])
+        return relabeled
+
+    @property
+    def component_rows(self):
+        """
+        Return a list of lists of the indices of the equations in each
+        component of the system (see components)
+        """
+        if self._component_rows is None:
+            with self.engine.stage('decompose'):
+                self._component_rows = self.connected_rows(
+                    self.entries, len(self.variables))
+        return self._component_rows
+
+    @property
+    def components(self):
+        """
+        Return a list of LinearSystems, one for each group of equations
+        which shares no variables with the other groups (or a list
+        containing just this system if there is one such group)
+        """
+        if self._components is None:
+            groups = self.component_rows
+            with self.engine.stage('decompose'):
+                if len(groups) == 1:
+                    self._components = [self]
+                else:
+                    self._components = list(map(self.subsystem, groups))
+            self.engine.add_counts(components=len(self._components))
+        return self._components
+
+    @staticmethod
+    def connected_rows(entries, width):
+        """
+        Return a list of lists of the indices of rows which are connected by
+        sharing columns, found by union-find over the columns of each row
+        """
+        parents = list(range(width))
+
+        def find(column):
+            while parents[column] != column:
+                parents[column] = parents[parents[column]]
+                column = parents[column]
+            return column
+
+        for entry in entries:
+            columns = iter(entry)
+            root = find(next(columns, 0)) if entry else None
+            for column in columns:
+                other_root = find(column)
+                if other_root != root:
+                    parents[other_root] = root
+        groups = collections.OrderedDict()
+        for index, entry in enumerate(entries):
+            # rows without variables are kept in groups of their own
+            key = find(next(iter(entry))) if entry else (index, )
+            groups.setdefault(key, []).append(index)
+        return list(groups.values())
+
+    def subsystem(self, row_indices):
+        """
+        Return the LinearSystem consisting of the equations of this system
+        with the given indices
+        """
+        variables = []
+        columns = {}
+        entries = []
+        for index in row_indices:
+            entry = {}
+            for column, coefficient in self.entries[index].items():
+                if column not in columns:
+                    columns[column] = len(variables)
+                    variables.append(self.variables[column])
+                entry[columns[column]] = coefficient
+            entries.append(entry)
+        return LinearSystem(self.engine,
+                            [self.equations[index] for index in row_indices],
+                            variables, entries,
+                            [self.constants[index] for index in row_indices])
+
+    def solution_vector(self, solutions):
+        """
+        Return a numpy array of the float values of solutions (a dict mapping
+        Variables to values) ordered like the variables of the system
+        """
+        from numpy import fromiter
+        return fromiter((solutions[variable] for variable in self.variables),
+                        float, len(self.variables))
+
+    def residuals(self, solutions, constants=None):
+        """
+        Return a numpy array of the differences between the left and right
+        hand sides of each equation given solutions (a dict mapping Variables
+        to values) computed in one sparse matrix-vector product
+
+        The right hand sides are the constants of the system unless other
+        constants (ordered like its equations) are given
+        """
+        if constants is not None:
+            constants = self.float_columns([constants])[:, 0]
+        else:
+            constants = self.float_constants
+        return self.sparse_matrix.dot(
+            self.solution_vector(solutions)) - constants
+
+    def verify(self, solutions, constants=None):
+        """
+        Return a Verification of how well solutions (a dict mapping Variables
+        to values) satisfy the equations of the system (or the equations
+        with other constants, see residuals)
+        """
+        return Verification(self.equations,
+                            self.residuals(solutions, constants))
+
+    def exact_residuals(self, vector):
+        """
+        Return the exact (rational) residuals of each equation given a list
+        of rational values ordered like the variables of the system
+        """
+        return [
+            sum(
+                fractions.Fraction(coefficient) * vector[column]
+                for column, coefficient in entry.items()) -
+            fractions.Fraction(constant)
+            for entry, constant in zip(self.entries, self.constants)
+        ]
+
+    def solve_mixed_precision(self,
+                              dtype='float64',
+                              iterations=4,
+                              rationalize=True,
+                              max_denominator=10**12):
+        """
+        Return the solutions of a square system found by solving in floating
+        point (float64 or, for huge systems, float32) and then iteratively
+        refining the solution with corrections computed from exact rational
+        residuals of the original coefficients
+
+        If rationalize is True and the refined solution rounds to rationals
+        (with denominators up to max_denominator) which solve the system
+        exactly those are returned, otherwise the refined floats are
+
+        Like SolutionMethod.NUMPY, raises a LinAlgError if the system is not
+        square or is singular (in the precision of dtype)
+        """
+        from numpy import array, isfinite
+        from numpy.linalg import LinAlgError
+        from scipy.linalg import LinAlgWarning, lu_factor, lu_solve
+        if len(self.equations) != len(self.variables):
+            raise LinAlgError("Expected a square system, got {} equations in "
+                              "{} variables".format(len(self.equations),
+                                                    len(self.variables)))
+        with warnings.catch_warnings():
+            # a singular factorization is reported below
+            warnings.simplefilter('ignore', LinAlgWarning)
+            factors = lu_factor(self.dense_matrix.astype(dtype))
+        pivots = factors[0].diagonal()
+        if not (pivots.all() and isfinite(pivots).all()):
+            raise LinAlgError("Singular matrix")
+        vector = [
+            fractions.Fraction(float(value))
+            for value in lu_solve(factors, self.float_constants.astype(dtype))
+        ]
+        for iteration in range(iterations + 1):
+            if rationalize:
+                # checking small rationals is cheaper than refining further
+                rationals = [
+                    value.limit_denominator(max_denominator)
+                    for value in vector
+                ]
+                if not any(self.exact_residuals(rationals)):
+                    return dict(
+                        zip(self.variables, (matrix.divide(
+                            rational.numerator, rational.denominator)
+                                             for rational in rationals)))
+            if iteration == iterations:
+                break
+            residuals = self.exact_residuals(vector)
+            if not any(residuals):
+                break
+            corrections = lu_solve(factors,
+                                   array(residuals, dtype=float).astype(dtype))
+            if not corrections.any():
+                break
+            vector = [
+                value - fractions.Fraction(float(correction))
+                for value, correction in zip(vector, corrections)
+            ]
+        return dict(zip(self.variables, map(float, vector)))
+
+    def refine(self, solutions, method=SolutionMethod.NUMPY, tolerance=1e-9,
+               iterations=5, constants=None):
+        """
+        Return solutions improved by iterative refinement: repeatedly
+        solving for the correction which cancels the residuals using the
+        (cached) factorization of the system
+
+        The solutions are refined for the constants of the system unless
+        other constants (ordered like its equations) are given
+        """
+        if constants is not None:
+            constants = self.float_columns([constants])[:, 0]
+        else:
+            constants = self.float_constants
+        factorization = self.factorize(method)
+        vector = self.solution_vector(solutions)
+        for _ in range(iterations):
+            residuals = self.sparse_matrix.dot(vector) - constants
+            if abs(residuals).max(initial=0) <= tolerance:
+                break
+            vector = vector - factorization.solve_batch([residuals])[0]
+        return dict(zip(self.variables, vector))
+
+    def _solve_least_squares(self):
+        from numpy import finfo
+        from numpy.linalg import svd
+        mat = self.dense_matrix
+        rows, columns = mat.shape
+        # every right singular vector is only needed to span the null space
+        # of a system with more variables than equations, and the left
+        # singular vectors beyond the rank are never needed (which for tall
+        # systems would take memory quadratic in the number of equations)
+        left, singular_values, right = svd(mat, full_matrices=rows < columns)
+        tolerance = max(mat.shape + (1, )) * singular_values.max(
+            initial=0) * finfo(float).eps
+        rank = int((singular_values > tolerance).sum())
+        particular = right[:rank].T.dot(
+            left[:, :rank].T.dot(self.float_constants) /
+            singular_values[:rank])
+        return ParametricSolution(
+            zip(self.variables, particular),
+            [dict(zip(self.variables, direction))
+             for direction in right[rank:]])
+
+    def _solve_rank_revealing(self):
+        width = len(self.variables)
+        rows = self.rows
+        pivots = matrix.rank_reduce_in_place(rows, width)
+        if not all(
+                matrix.is_additive_identity(row[-1])
+                for row in rows[len(pivots):]):
+            # inconsistent so solve the normal equations instead
+            rows = self.normal_rows
+            pivots = matrix.rank_reduce_in_place(rows, width)
+        mult_identity = self.engine.parsed_expression_class.mult_identity
+        add_identity = self.engine.parsed_expression_class.add_identity
+        free_columns = sorted(set(range(width)) - set(pivots))
+        particular = dict.fromkeys(self.variables, add_identity)
+        for row, column in zip(rows, pivots):
+            particular[self.variables[column]] = row[-1]
+        directions = []
+        for free_column in free_columns:
+            direction = dict.fromkeys(self.variables, add_identity)
+            direction[self.variables[free_column]] = mult_identity
+            for row, column in zip(rows, pivots):
+                direction[self.variables[column]] = -row[free_column]
+            directions.append(direction)
+        return ParametricSolution(
+            particular, directions,
+            [self.variables[column] for column in free_columns])
+
+    @property
+    def normal_rows(self):
+        """
+        Return the rows of the augmented matrix of the normal equations of
+        the system (whose solutions are the least squares solutions of the
+        system)
+        """
+        add_identity = self.engine.parsed_expression_class.add_identity
+        width = len(self.variables)
+        rows = [[add_identity] * (width + 1) for _ in range(width)]
+        for entry, constant in zip(self.entries, self.constants):
+            for column, coefficient in entry.items():
+                row = rows[column]
+                for other_column, other_coefficient in entry.items():
+                    row[other_column] = row[other_column] + \
+                        coefficient * other_coefficient
+                row[width] = row[width] + coefficient * constant
+        return rows
+
+    @property
+    def triangular_structure(self):
+        """
+        Return the block triangular structure of the system (see
+        LinearSystem.peel)
+        """
+        if self._triangular_structure is None:
+            self._triangular_structure = self.peel(self.entries,
+                                                   len(self.variables))
+        return self._triangular_structure
+
+    @staticmethod
+    def peel(entries, width):
+        """
+        Return a tuple (forward, core_rows, core_columns, backward) splitting
+        a system into chains of definitions around a coupled core
+
+        forward lists (row index, column) pairs of rows which, in order,
+        each have a single unknown once the columns of the previous pairs are
+        known. backward lists pairs of columns which, once the forward pairs
+        are removed, appear in a single row and so can be found from that
+        row after the rest of the system is solved (in reverse order). The
+        remaining rows and columns form the core which must be solved by
+        elimination. Both peels take time linear in the number of terms.
+        """
+        row_counts = [len(entry) for entry in entries]
+        column_rows = [[] for _ in range(width)]
+        for index, entry in enumerate(entries):
+            for column in entry:
+                column_rows[column].append(index)
+        row_done = [False] * len(entries)
+        column_done = [False] * width
+
+        forward = []
+        queue = collections.deque(
+            index for index, count in enumerate(row_counts) if count == 1)
+        while queue:
+            index = queue.popleft()
+            if row_done[index] or row_counts[index] != 1:
+                continue
+            column = next(column for column in entries[index]
+                          if not column_done[column])
+            if matrix.is_additive_identity(entries[index][column]):
+                continue
+            row_done[index] = column_done[column] = True
+            forward.append((index, column))
+            for other in column_rows[column]:
+                row_counts[other] -= 1
+                if row_counts[other] == 1 and not row_done[other]:
+                    queue.append(other)
+
+        column_counts = [0] * width
+        for index, entry in enumerate(entries):
+            if not row_done[index]:
+                for column in entry:
+                    if not column_done[column]:
+                        column_counts[column] += 1
+        backward = []
+        queue = collections.deque(
+            column for column, count in enumerate(column_counts)
+            if count == 1)
+        while queue:
+            column = queue.popleft()
+            if column_done[column] or column_counts[column] != 1:
+                continue
+            index = next(index for index in column_rows[column]
+                         if not row_done[index])
+            if matrix.is_additive_identity(entries[index][column]):
+                continue
+            row_done[index] = column_done[column] = True
+            backward.append((index, column))
+            for other in entries[index]:
+                if not column_done[other]:
+                    column_counts[other] -= 1
+                    if column_counts[other] == 1:
+                        queue.append(other)
+
+        core_rows = [
+            index for index, done in enumerate(row_done) if not done
+        ]
+        core_columns = [
+            column for column, done in enumerate(column_done) if not done
+        ]
+        return forward, core_rows, core_columns, backward
+
+    def _solve_by_substitution(self, method, columns):
+        """
+        Return the solution vectors of the system for each column of
+        constants found by substituting through its chains of definitions
+        and eliminating only in its core, or None if the system has no such
+        structure
+        """
+        forward, core_rows, core_columns, backward = self.triangular_structure
+        if not (forward or backward) or len(core_rows) != len(core_columns):
+            return None
+        divide = matrix.divide
+        if method in (SolutionMethod.BUILTIN, SolutionMethod.FRACTION_FREE):
+            convert = lambda value: value
+        elif method == SolutionMethod.FIELD:
+            convert = self.engine.field.convert
+            divide = self.engine.field.divide
+        else:
+            convert = float
+        vectors = [[None] * len(self.variables) for _ in columns]
+
+        def substitute(index, column):
+            entry = self.entries[index]
+            for constants, vector in zip(columns, vectors):
+                total = convert(constants[index])
+                for other, coefficient in entry.items():
+                    if other != column:
+                        total = total - convert(coefficient) * vector[other]
+                vector[column] = divide(total, convert(entry[column]))
+
+        self.engine.add_counts(
+            substituted=len(forward) + len(backward),
+            core_variables=len(core_columns))
+        for index, column in forward:
+            substitute(index, column)
+        if core_rows:
+            positions = {column: position
+                         for position, column in enumerate(core_columns)}
+            entries = []
+            core_constants = [[] for _ in columns]
+            for index in core_rows:
+                entries.append({
+                    positions[column]: coefficient
+                    for column, coefficient in self.entries[index].items()
+                    if column in positions
+                })
+                for constants, vector, core_column in zip(
+                        columns, vectors, core_constants):
+                    constant = convert(constants[index])
+                    for column, coefficient in self.entries[index].items():
+                        if column not in positions:
+                            constant = constant - convert(
+                                coefficient) * vector[column]
+                    core_column.append(constant)
+            core = LinearSystem(
+                self.engine, [self.equations[index] for index in core_rows],
+                [self.variables[column] for column in core_columns], entries,
+                core_constants[0])
+            with self.engine.stage('eliminate'):
+                core_vectors = core._eliminate_columns(method, core_constants)
+            for vector, core_vector in zip(vectors, core_vectors):
+                for column, value in zip(core_columns, core_vector):
+                    vector[column] = value
+        for index, column in reversed(backward):
+            substitute(index, column)
+        return vectors
+
+    @property
+    def field_system(self):
+        """
+        Return the system with its coefficients and constants converted into
+        the field of its engine, dropping coefficients which become zero
+        """
+        if self._field_system is None:
+            engine_field = self.engine.field
+            with self.engine.stage('convert'):
+                entries = []
+                constants = []
+                for entry, constant in zip(self.entries, self.constants):
+                    entries.append({})
+                    for column, coefficient in entry.items():
+                        coefficient = self.convert_into_field(
+                            coefficient, entry, column)
+                        if not engine_field.is_zero(coefficient):
+                            entries[-1][column] = coefficient
+                    constants.append(self.convert_into_field(constant, entry))
+            system = LinearSystem(self.engine, self.equations, self.variables,
+                                  entries, constants)
+            system._field_system = system
+            self._field_system = system
+        return self._field_system
+
+    def convert_into_field(self, value, entry, column=None):
+        """
+        Return a coefficient (of the variable of a column) or constant of a
+        row of the system converted into the field of the engine, raising a
+        ValueError naming it if it has no representation in the field
+        """
+        try:
+            return self.engine.field.convert(value)
+        except ValueError:
+            description = "constant {}".format(value) if column is None \
+                else "coefficient {} of {}".format(value,
+                                                   self.variables[column])
+            variables = [self.variables[index] for index in sorted(entry)]
+            raise ValueError(
+                "The {} in an equation in {} is not representable in "
+                "{}".format(description, ", ".join(map(str, variables)),
+                            self.engine.field))
+
+    def _solve(self, method, substitute=True):
+        if method == SolutionMethod.FIELD and self.field_system is not self:
+            # peel and eliminate only coefficients nonzero in the field
+            return self.field_system._solve(method, substitute)
+        return self._solve_columns(method, [self.constants], substitute)[0]
+
+    def _solve_columns(self, method, columns, substitute=True):
+        if method == SolutionMethod.FIELD and self.field_system is not self:
+            with self.engine.stage('convert'):
+                columns = [[
+                    self.convert_into_field(constant, entry)
+                    for entry, constant in zip(self.entries, column)
+                ] for column in columns]
+            return self.field_system._solve_columns(method, columns,
+                                                    substitute)
+        if substitute:
+            with self.engine.stage('substitute'):
+                vectors = self._solve_by_substitution(method, columns)
+            if vectors is not None:
+                return vectors
+        with self.engine.stage('eliminate'):
+            return self._eliminate_columns(method, columns)
+
+    @property
+    def fill_reducing_order(self):
+        """
+        Return the column indices of the system in a minimum degree order
+        (see matrix.minimum_degree_order)
+        """
+        if self._fill_reducing_order is None:
+            self._fill_reducing_order = matrix.minimum_degree_order(
+                self.entries, len(self.variables))
+        return self._fill_reducing_order
+
+    def _eliminate_columns(self, method, columns):
         if method == SolutionMethod.BUILTIN:
+            vectors = None
+            if len(self.equations) == len(self.variables):
+                order = self.fill_reducing_order
+                vectors = matrix.sparse_solve_columns(self.entries, columns,
+                                                      order)
+                if vectors is not None and self.engine.collecting():
+                    self.engine.add_counts(
+                        fill_in=matrix.symbolic_fill_in(self.entries, order))
+            if vectors is not None:
+                return vectors
             # TODO investigate bug with BUILTIN method and return
             # to default when done
-            reduced = matrix.AugmentedMatrix(rows).reduced_form
-            return dict(zip(variables, reduced.constants))
+            rows = self.augmented_rows(columns)
+            matrix.reduce_rows_in_place(rows, width=len(self.variables))
+            # rows past the variables of an overdetermined system are zero
+            rows = rows[:len(self.variables)]
+            return [[row[position - len(columns)] for row in rows]
+                    for position in range(len(columns))]
         elif method == SolutionMethod.NUMPY:
-            from numpy import array
             from numpy.linalg import solve
-            mat = array(list(list(map(float, row[:-1])) for row in rows))
-            constants = array(list(list(map(float, row[-1:])) for row in rows))
-            solutions = [row[0] for row in solve(mat, constants)]
-            return dict(zip(variables, solutions))
+            return solve(self.dense_matrix, self.float_columns(columns)).T
+        elif method == SolutionMethod.FRACTION_FREE:
+            return matrix.fraction_free_solve_columns(
+                self.augmented_rows(columns))
+        elif method == SolutionMethod.SPARSE:
+            from numpy import isfinite
+            from numpy.linalg import LinAlgError
+            from scipy.sparse.linalg import MatrixRankWarning, spsolve
+            with warnings.catch_warnings():
+                # spsolve only warns of a singular matrix (solving for NaN)
+                warnings.simplefilter('ignore', MatrixRankWarning)
+                vectors = spsolve(self.sparse_matrix,
+                                  self.float_columns(columns))
+            if not isfinite(vectors).all():
+                raise LinAlgError("Singular matrix")
+            # spsolve flattens solutions for a single column of constants
+            return vectors.reshape(len(self.variables), len(columns)).T
+        elif method == SolutionMethod.FIELD:
+            return self.engine.field.eliminate_columns(
+                self.augmented_rows(columns))
         else:
             raise ValueError(method)
 
+    def factorize(self, method=SolutionMethod.NUMPY):
+        """
+        Return a Factorization of the coefficient matrix of the system
+        which can be used to solve for many constants
+        """
+        factorization_classes = {
+            SolutionMethod.BUILTIN: BuiltinFactorization,
+            SolutionMethod.NUMPY: NumpyFactorization,
+            SolutionMethod.SPARSE: SparseFactorization,
+            SolutionMethod.FRACTION_FREE: FractionFreeFactorization,
+        }
+        if method not in factorization_classes:
+            raise ValueError(method)
+        if method not in self._factorizations:
+            self._factorizations[method] = factorization_classes[method](self)
+        return self._factorizations[method]
+
+
+class Factorization(object):
+    """
+    Abstract base class for a factorized coefficient matrix of a LinearSystem
+    """
+
+    def __init__(self, system):
+        self.system = system
+
+    def solve(self, constants=None):
+        """
+        Return the solutions of the system as a dict mapping Variables to
+        values given the constants of each equation in the order of
+        system.equations (by default the constants the system was compiled
+        with)
+        """
+        if constants is None:
+            constants = self.system.constants
+        solutions = self.solve_batch([constants])[0]
+        return dict(zip(self.system.variables, solutions))
+
+    def solve_batch(self, batch):
+        """
+        Return a list of solution vectors ordered like system.variables, one
+        for each vector of constants in the batch
+
+        Must be implemented by individual subclasses
+        """
+        raise NotImplementedError
+
+
+class NumpyFactorization(Factorization):
+    """
+    LU factorization of a dense coefficient matrix using scipy
+    """
+
+    def __init__(self, system):
+        from scipy.linalg import lu_factor
+        super().__init__(system)
+        self.factors = lu_factor(system.dense_matrix)
+
+    def solve_batch(self, batch):
+        """
+        Return a 2d array whose rows are the solutions for each vector of
+        constants in the batch
+        """
+        from numpy import array
+        from scipy.linalg import lu_solve
+        constants = array(batch, dtype=float).T
+        return lu_solve(self.factors, constants).T
+
+
+class SparseFactorization(Factorization):
+    """
+    Sparse LU factorization of a coefficient matrix using scipy's SuperLU
+    """
+
+    def __init__(self, system):
+        from scipy.sparse.linalg import splu
+        super().__init__(system)
+        with system.engine.stage('factorize'):
+            self.factors = splu(system.sparse_matrix.tocsc())
+        system.engine.add_counts(
+            fill_in=self.factors.L.nnz + self.factors.U.nnz -
+            system.shape[0] - system.sparse_matrix.nnz)
+
+    def solve_batch(self, batch):
+        """
+        Return a 2d array whose rows are the solutions for each vector of
+        constants in the batch
+        """
+        from numpy import array
+        constants = array(batch, dtype=float).T
+        return self.factors.solve(constants).T
+
+
+class BuiltinFactorization(Factorization):
+    """
+    Exact inverse of a coefficient matrix found by reducing the matrix
+    augmented with the identity
+    """
+
+    def __init__(self, system):
+        super().__init__(system)
+        mult_identity = system.engine.parsed_expression_class.mult_identity
+        add_identity = system.engine.parsed_expression_class.add_identity
+        size = len(system.equations)
+        rows = system.engine.dense_rows(system.entries, [add_identity] * size,
+                                        len(system.variables))
+        for index, row in enumerate(rows):
+            row[-1:] = [add_identity] * size
+            row[len(system.variables) + index] = mult_identity
+        matrix.reduce_rows_in_place(rows)
+        self.inverse = [row[len(system.variables):] for row in rows]
+
+    def solve_batch(self, batch):
+        """
+        Return a list of the exact solutions for each vector of constants in
+        the batch
+        """
+        return [[
+            matrix.dot_product(inverse_row, constants)
+            for inverse_row in self.inverse
+        ] for constants in batch]
+
+
+class FractionFreeFactorization(Factorization):
+    """
+    Exact inverse of a rational coefficient matrix found as an integer
+    matrix and a single common denominator using fraction-free elimination
+    """
+
+    def __init__(self, system):
+        super().__init__(system)
+        size = len(system.equations)
+        width = len(system.variables)
+        rows = [
+            row[:-1]
+            for row in system.engine.dense_rows(system.entries, [0] * size,
+                                                width)
+        ]
+        # constants must be scaled like the rows of the coefficient matrix
+        # before being multiplied by the inverse
+        self.scales = list(map(matrix.row_scale, rows))
+        rows = list(map(matrix.integer_row, rows))
+        for index, row in enumerate(rows):
+            row.extend([0] * size)
+            row[width + index] = 1
+        self.determinant = matrix.fraction_free_reduce_in_place(rows)
+        self.adjugate = [row[width:] for row in rows]
+
+    def solve_batch(self, batch):
+        """
+        Return a list of the exact solutions for each vector of constants in
+        the batch
+        """
+        solutions = []
+        for constants in batch:
+            scaled = [
+                scale * constant
+                for scale, constant in zip(self.scales, constants)
+            ]
+            solutions.append([
+                matrix.divide(
+                    matrix.dot_product(adjugate_row, scaled), self.determinant)
+                for adjugate_row in self.adjugate
+            ])
+        return solutions
+
+
+class ReducedRow(object):
+    """
+    A row of the reduced form of an incrementally solved system along with
+    the combination of equations which it is equal to
+    """
+    __slots__ = ('pivot', 'coefficients', 'constant', 'combination')
+
+    def __init__(self, coefficients, constant, combination, pivot=None):
+        self.pivot = pivot
+        self.coefficients = coefficients
+        self.constant = constant
+        self.combination = combination
+
+
+class IncrementalSolver(object):
+    """
+    Maintains the reduced row echelon form of a growing or shrinking set of
+    linear equations using exact arithmetic
+
+    Adding or discarding an equation only touches the rows of the reduced
+    form that share variables with it, so solutions are updated in time
+    proportional to the change rather than the size of the system
+    """
+
+    def __init__(self, equations=(), engine=LinearEngine):
+        self.engine = engine
+        # maps pivot variables to their rows
+        self.rows = {}
+        # rows whose coefficients were all eliminated (i.e. dependencies
+        # between equations)
+        self.null_rows = set()
+        # maps non-pivot variables to the rows they appear in
+        self.occurrences = {}
+        # maps equations to the rows they contribute to
+        self.dependents = {}
+        self.solutions = {}
+        for equation in equations:
+            self.add(equation)
+
+    @property
+    def equations(self):
+        """
+        Return the set of equations currently in the system
+        """
+        return set(self.dependents)
+
+    @property
+    def consistent(self):
+        """
+        Return whether the equations in the system have a common solution
+        """
+        return all(
+            matrix.is_additive_identity(row.constant)
+            for row in self.null_rows)
+
+    def add(self, equation):
+        """
+        Add an equation to the system and return the set of variables whose
+        solutions changed
+        """
+        if equation in self.dependents:
+            return set()
+        mult_identity = self.engine.parsed_expression_class.mult_identity
+        add_identity = self.engine.parsed_expression_class.add_identity
+        coefficients = self.engine.parse_equation(equation)
+        row = ReducedRow({
+            variable: coefficient
+            for variable, coefficient in coefficients.items()
+            if isinstance(variable, expression.Expression)
+            and not matrix.is_additive_identity(coefficient)
+        }, -coefficients.get(mult_identity, add_identity),
+                         {equation: mult_identity})
+        self.dependents[equation] = {row}
+        for variable in [
+                variable for variable in row.coefficients
+                if variable in self.rows
+        ]:
+            self._subtract(row, self.rows[variable],
+                           row.coefficients[variable])
+        if not row.coefficients:
+            self.null_rows.add(row)
+            return set()
+
+        pivot = next(iter(row.coefficients))
+        self._scale(row, row.coefficients[pivot])
+        row.pivot = pivot
+        changed = {row}
+        for other in self.occurrences.pop(pivot, set()):
+            self._subtract(other, row, other.coefficients[pivot])
+            changed.add(other)
+        self.rows[pivot] = row
+        for variable in row.coefficients:
+            if variable != pivot:
+                self.occurrences.setdefault(variable, set()).add(row)
+        return self._update_solutions(changed)
+
+    def discard(self, equation):
+        """
+        Remove an equation from the system if present and return the set of
+        variables whose solutions changed
+        """
+        if equation not in self.dependents:
+            return set()
+        candidates = self.dependents[equation]
+        null_candidates = candidates & self.null_rows
+        # dropping a dependency never loses a pivot so prefer it
+        removed = min(
+            null_candidates or candidates,
+            key=lambda row: len(row.coefficients))
+        removed_coefficient = removed.combination[equation]
+        changed = set()
+        for other in list(candidates):
+            if other is removed:
+                continue
+            self._subtract(other, removed,
+                           matrix.divide(other.combination[equation],
+                                         removed_coefficient))
+            changed.add(other)
+
+        for contributor in removed.combination:
+            self.dependents[contributor].discard(removed)
+        del self.dependents[equation]
+        if removed.pivot is None:
+            self.null_rows.discard(removed)
+        else:
+            del self.rows[removed.pivot]
+            for variable in removed.coefficients:
+                if variable in self.occurrences:
+                    self.occurrences[variable].discard(removed)
+        changed_variables = self._update_solutions(changed)
+        if removed.pivot is not None and removed.pivot in self.solutions:
+            del self.solutions[removed.pivot]
+            changed_variables.add(removed.pivot)
+        return changed_variables
+
+    def _scale(self, row, divisor):
+        row.coefficients = {
+            variable: matrix.divide(coefficient, divisor)
+            for variable, coefficient in row.coefficients.items()
+        }
+        row.constant = matrix.divide(row.constant, divisor)
+        row.combination = {
+            equation: matrix.divide(coefficient, divisor)
+            for equation, coefficient in row.combination.items()
+        }
+
+    def _subtract(self, target, source, factor):
+        """
+        Subtract a multiple of the source row from the target row
+        """
+        add_identity = self.engine.parsed_expression_class.add_identity
+        for variable, coefficient in source.coefficients.items():
+            value = target.coefficients.get(variable,
+                                            add_identity) - factor * coefficient
+            registered = target.pivot is not None and variable != target.pivot
+            if matrix.is_additive_identity(value):
+                target.coefficients.pop(variable, None)
+                if registered and variable in self.occurrences:
+                    self.occurrences[variable].discard(target)
+            else:
+                if registered and variable not in target.coefficients:
+                    self.occurrences.setdefault(variable, set()).add(target)
+                target.coefficients[variable] = value
+        target.constant = target.constant - factor * source.constant
+        for equation, coefficient in source.combination.items():
+            value = target.combination.get(equation,
+                                           add_identity) - factor * coefficient
+            if matrix.is_additive_identity(value):
+                target.combination.pop(equation, None)
+                self.dependents[equation].discard(target)
+            else:
+                target.combination[equation] = value
+                self.dependents[equation].add(target)
+
+    def _update_solutions(self, rows):
+        changed_variables = set()
+        for row in rows:
+            if row.pivot is None:
+                continue
+            if len(row.coefficients) == 1:
+                if row.pivot not in self.solutions or \
+                   self.solutions[row.pivot] != row.constant:
+                    self.solutions[row.pivot] = row.constant
+                    changed_variables.add(row.pivot)
+            elif row.pivot in self.solutions:
+                del self.solutions[row.pivot]
+                changed_variables.add(row.pivot)
+        return changed_variables
+
 
 class PlanarEngine(LinearEngine):
     """
     Deduction engine for solving linear systems consisting of 2d vectors
+
+    Systems whose equations are linear combinations of vector variables and
+    constant vectors are parsed once and solved for every coordinate
+    together. Subclasses may set dimension and vector_class to solve such
+    systems of vectors with any number of coordinates.
     """
+    parsed_expression_class = VectorSumOfProducts
+    dimension = 2
+    vector_class = plane.PlaneVector
 
     @classmethod
-    def solve_equation_set(cls, eq_set, method=SolutionMethod.NUMPY):
-        split_eq_set = set()
-        for equation in eq_set:
-            split_subj = cls.split_expression(equation.subj)
-            split_obj = cls.split_expression(equation.obj)
-            if len(split_subj) != len(split_obj):
-                raise ValueError("Mixing vector and scalar expressions")
-            for subj_part, obj_part in zip(split_subj, split_obj):
-                split_eq_set.add(subj_part == obj_part)
-        split_solutions = super().solve_equation_set(
-            split_eq_set, method=method)
+    def solve_equation_set(cls,
+                           eq_set,
+                           method=SolutionMethod.NUMPY,
+                           vectorize=True,
+                           as_array=False,
+                           verify=False,
+                           tolerance=1e-9,
+                           decompose=True,
+                           substitute=True):
+        """
+        Return the solutions of a system of vector equations as a dict
+        mapping vector Variables to vectors (or as a VectorArray if as_array
+        is True)
+
+        If vectorize is True (and the method finds unique solutions) the
+        system is solved as a single system of scalar coefficients with one
+        column of constants per coordinate when possible, otherwise every
+        equation is split into one equation per coordinate. Either way the
+        remaining options are those of LinearEngine.solve_equation_set.
+        """
+        options = dict(
+            verify=verify,
+            tolerance=tolerance,
+            decompose=decompose,
+            substitute=substitute)
+        with cls.instrumented():
+            if vectorize and method in DECOMPOSABLE_METHODS:
+                solutions = cls.solve_vector_equation_set(
+                    eq_set, method, as_array=as_array, **options)
+                if solutions is not None:
+                    return solutions
+            with cls.stage('split'):
+                split_eq_set = set()
+                for equation in eq_set:
+                    split_subj = cls.split_expression(equation.subj)
+                    split_obj = cls.split_expression(equation.obj)
+                    if len(split_subj) != len(split_obj):
+                        raise ValueError(
+                            "Mixing vector and scalar expressions")
+                    for subj_part, obj_part in zip(split_subj, split_obj):
+                        split_eq_set.add(subj_part == obj_part)
+            split_solutions = super().solve_equation_set(
+                split_eq_set, method=method, **options)
         vector_variables = {
             component.variable
             for component in split_solutions
         }
-        return {
+        solutions = {
             vector_variable: plane.PlaneVector(
                 (split_solutions[vector_variable.x],
                  split_solutions[vector_variable.y]))
             for vector_variable in vector_variables
         }
+        if as_array:
+            return cls.vector_array(solutions, list(zip(*solutions.values())))
+        return solutions
+
+    @classmethod
+    def vector_array(cls, variables, coordinates):
+        """
+        Return a VectorArray (a PlaneVectorArray for 2d vectors) of the
+        vectors of variables given an array or list of lists with one row
+        per coordinate
+        """
+        from pivot.ontology import array
+        if cls.vector_class is plane.PlaneVector:
+            return array.PlaneVectorArray(variables, coordinates)
+        return array.VectorArray(variables, coordinates, cls.vector_class)
+
+    @classmethod
+    def parse_vector_equation_set(cls, eq_set, parsed=None):
+        """
+        Return the vector variables of a system of vector equations along
+        with a list of dicts (one per equation) mapping column indices to
+        scalar coefficients and a list of the constant vectors of each
+        equation, or None if the equations are not all linear combinations
+        of vector variables and constant vectors
+
+        Equations already parsed are not parsed again (see
+        parse_equation_set)
+        """
+        add_identity = cls.parsed_expression_class.add_identity
+        variables = []
+        columns = {}
+        entries = []
+        constants = []
+        if parsed is None:
+            parsed = map(cls.parse_equation, eq_set)
+        for coefficients in parsed:
+            entry = {}
+            constant = [add_identity] * cls.dimension
+            for term, coefficient in coefficients.items():
+                if isinstance(term, expression.Vector):
+                    if len(term.items) != cls.dimension or any(
+                            isinstance(item, expression.Expression)
+                            for item in term.items):
+                        return None
+                    constant = [
+                        component - coefficient * item
+                        for component, item in zip(constant, term.items)
+                    ]
+                elif isinstance(term, expression.VariableAttribute) \
+                        or not isinstance(term, expression.Variable):
+                    if isinstance(term, expression.Expression) \
+                       or not matrix.is_additive_identity(coefficient):
+                        return None
+                else:
+                    if term not in columns:
+                        columns[term] = len(variables)
+                        variables.append(term)
+                    entry[columns[term]] = coefficient
+            entries.append(entry)
+            constants.append(constant)
+        return variables, entries, constants
+
+    @classmethod
+    def compile_vector_equation_set(cls, eq_set):
+        """
+        Return a list of LinearSystems sharing the coefficients of a system
+        of vector equations, one for each coordinate of its constants, or
+        None if it cannot be parsed (see parse_vector_equation_set)
+
+        Compiled systems are cached like those of compile_equation_set
+        """
+        key = (cls, frozenset(map(equation_key, eq_set)), cls.dimension)
+        systems = cls.compiled_systems.get(key)
+        if systems is None:
+            with cls.stage('parse'):
+                equations, parsed = cls.canonical_equations(eq_set)
+                parsed = cls.parse_vector_equation_set(equations, parsed)
+            if parsed is None:
+                return None
+            variables, entries, constants = parsed
+            systems = [
+                LinearSystem(cls, equations, variables, entries,
+                             [constant[index] for constant in constants])
+                for index in range(cls.dimension)
+            ]
+            cls.compiled_systems.put(key, systems,
+                                     sum(system.cost for system in systems))
+            cls.add_counts(
+                equations=len(equations),
+                variables=len(variables),
+                nonzeros=sum(map(len, entries)))
+        else:
+            cls.add_counts(cache_hits=1)
+        return systems
+
+    @classmethod
+    def solve_vector_equation_set(cls,
+                                  eq_set,
+                                  method=SolutionMethod.NUMPY,
+                                  as_array=False,
+                                  verify=False,
+                                  tolerance=1e-9,
+                                  decompose=True,
+                                  substitute=True):
+        """
+        Return the solutions of a system of vector equations found by
+        solving for every coordinate with the same coefficients (see
+        compile_vector_equation_set), or None if it cannot be solved this
+        way
+
+        Except with MIXED_PRECISION, which solves for each coordinate in
+        turn, the coefficients are eliminated once for the columns of
+        constants of every coordinate (see LinearSystem.solve_columns). If
+        as_array is True the solutions are returned as a VectorArray holding
+        the solved coordinates.
+        """
+        systems = cls.compile_vector_equation_set(eq_set)
+        if systems is None:
+            return None
+        first = systems[0]
+        if method == SolutionMethod.MIXED_PRECISION:
+            coordinates = []
+            for system in systems:
+                solutions = system.solve(method, decompose=decompose)
+                coordinates.append(
+                    [solutions[variable] for variable in system.variables])
+        else:
+            coordinates = first.solve_columns(
+                [system.constants for system in systems],
+                method,
+                verify=verify,
+                tolerance=tolerance,
+                decompose=decompose,
+                substitute=substitute)
+        if as_array:
+            return cls.vector_array(first.variables, coordinates)
+        return {
+            variable: cls.vector_class(values)
+            for variable, values in zip(first.variables, zip(*coordinates))
+        }
 
     @classmethod
     def _split_operational_expression(cls, exp):
@@ -205,12 +2077,14 @@ class PlanarEngine(LinearEngine):
                 for subexp in cls.split_expression(exp.arguments[0])
             ]
         elif exp.operator == "*":
-            scalar = cls.split_expression(exp.arguments[0])
-            if len(scalar) != 1:
+            factors = list(map(cls.split_expression, exp.arguments))
+            lengths = list(map(len, factors))
+            if sum(length != 1 for length in lengths) > 1:
                 raise ValueError("Cannot multiply by vector")
             return [
-                scalar[0] * subexp
-                for subexp in cls.split_expression(exp.arguments[1])
+                expression.product_of(*(factor[index if len(factor) != 1
+                                               else 0] for factor in factors))
+                for index in range(max(lengths))
             ]
 
         subexpressions = list(map(cls.split_expression, exp.arguments))
@@ -271,6 +2145,28 @@ class PlanarEngine(LinearEngine):
                 cls.evaluate_expression(subexp, values)
                 for subexp in exp.arguments
             ]
-            return OPERATOR_MAP[exp.operator](*subvalues)
+            return functools.reduce(OPERATOR_MAP[exp.operator], subvalues)
         else:
             raise TypeError(type(exp))
+
+    @classmethod
+    def compile_expression(cls, exp):
+        """
+        Return a CompiledExpression which, when called with values for the
+        subexpressions of an expression, returns the same value as
+        evaluate_expression
+
+        The values may be numpy arrays (or PlaneVectors of numpy arrays) in
+        which case the expression is evaluated for all of them at once
+        """
+        return CompiledExpression([exp])
+
+    @classmethod
+    def compile_residuals(cls, eq_set):
+        """
+        Return a CompiledResiduals which, when called with values for the
+        variables of an equation set, returns a list of the differences
+        between the sides of each equation (in the order of its equations
+        attribute)
+        """
+        return CompiledResiduals(eq_set)
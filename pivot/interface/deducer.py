@@ -2,23 +2,295 @@
 Mathematical Deducer and related classes
 """
 
+import asyncio
+import collections
+import contextlib
+import contextvars
+import functools
+import importlib
+import time
+import weakref
+
+# the list to which the SolveStats of each solve are appended (if any)
+COLLECTED_STATS = contextvars.ContextVar('collected_stats', default=None)
+# the SolveStats of the solve in progress (if stats are being collected)
+ACTIVE_STATS = contextvars.ContextVar('active_stats', default=None)
+
+
+@contextlib.contextmanager
+def collect_stats():
+    """
+    Collect the SolveStats of every solve made in the body of a with
+    statement into the list it returns
+    """
+    collected = []
+    token = COLLECTED_STATS.set(collected)
+    try:
+        yield collected
+    finally:
+        COLLECTED_STATS.reset(token)
+
+
+class SolveStats(object):
+    """
+    Statistics of a single solve: the wall time spent in each stage and
+    counts such as the number of terms, matrix dimensions, nonzeros and
+    fill-in
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.stages = collections.OrderedDict()
+        self.counts = collections.OrderedDict()
+
+    def __repr__(self):
+        return "SolveStats({}, stages={}, counts={})".format(
+            self.engine.__name__, dict(self.stages), dict(self.counts))
+
+    def add_time(self, stage, seconds):
+        """
+        Add to the time spent in a stage (stages may run more than once)
+        """
+        self.stages[stage] = self.stages.get(stage, 0) + seconds
+
+    def add_counts(self, **counts):
+        """
+        Add to named counts
+        """
+        for name, value in counts.items():
+            self.counts[name] = self.counts.get(name, 0) + value
+
+    def as_dict(self):
+        """
+        Return the stats as a dict of plain values (e.g. to serialize)
+        """
+        return {
+            'engine': self.engine.__name__,
+            'stages': dict(self.stages),
+            'counts': dict(self.counts),
+        }
+
+
+class SolverOverloaded(Exception):
+    """
+    Raised when a Solver already has its maximum number of pending requests
+    """
+    pass
+
 
 class Deducer(object):
     """
     Makes logical deductions by calling out to SolvingEngins
     """
-    pass
+
+    def __init__(self, engines=()):
+        self.engines = []
+        for engine in engines:
+            self.register(engine)
+
+    def register(self, engine, statement_type=None, predicate=None):
+        """
+        Register an engine for statements of a given type for which a
+        predicate holds (by default all statements)
+
+        Engines are tried in the order in which they were registered
+        """
+        self.engines.append((statement_type, predicate, engine))
+        return engine
+
+    def engine_for(self, statement):
+        """
+        Return the first registered engine able to handle a statement
+        """
+        for statement_type, predicate, engine in self.engines:
+            if statement_type is not None \
+               and not isinstance(statement, statement_type):
+                continue
+            if predicate is not None and not predicate(statement):
+                continue
+            return engine
+        raise LookupError("No engine registered for {!r}".format(statement))
 
 
 class Solver(Deducer):
     """
     A type of Deducer that solves equations
+
+    Equation sets are routed to registered engines (by default a
+    LinearEngine). Solves may be run asynchronously in an executor, in which
+    case concurrent requests for identical equation sets share a single
+    solve, at most max_concurrent solves run at once and at most max_pending
+    distinct requests may be waiting before new ones are rejected with
+    SolverOverloaded.
     """
-    pass
+    default_engine = ('pivot.deduction.linear', 'LinearEngine')
+
+    def __init__(self,
+                 engines=None,
+                 executor=None,
+                 max_concurrent=None,
+                 max_pending=None):
+        if engines is None:
+            module_name, engine_name = self.default_engine
+            engines = [
+                getattr(importlib.import_module(module_name), engine_name)
+            ]
+        super().__init__(engines)
+        self.executor = executor
+        self.max_concurrent = max_concurrent
+        self.max_pending = max_pending
+        # a semaphore is bound to the event loop it is first used in, so
+        # one is created for each loop the Solver is used from
+        self.semaphores = weakref.WeakKeyDictionary()
+        self.pending = {}
+
+    def solve(self, eq_set, **kwargs):
+        """
+        Return the solutions to an equation set found by its engine
+        """
+        return self.engine_for(eq_set).solve_equation_set(eq_set, **kwargs)
+
+    async def solve_async(self, eq_set, **kwargs):
+        """
+        Return the solutions to an equation set found by its engine in the
+        executor of the Solver without blocking the event loop
+        """
+        key = (frozenset(eq_set), frozenset(kwargs.items()))
+        if key not in self.pending:
+            if self.max_pending is not None \
+               and len(self.pending) >= self.max_pending:
+                raise SolverOverloaded(
+                    "{} requests already pending".format(len(self.pending)))
+            task = asyncio.ensure_future(self._run(eq_set, kwargs))
+            self.pending[key] = task
+            task.add_done_callback(lambda _: self.pending.pop(key, None))
+        # shield so that one cancelled caller does not cancel a shared solve
+        return await asyncio.shield(self.pending[key])
+
+    async def _run(self, eq_set, kwargs):
+        """
+        Solve an equation set in the executor once a slot is available
+        """
+        loop = asyncio.get_running_loop()
+        call = functools.partial(self.solve, eq_set, **kwargs)
+        if self.max_concurrent is None:
+            return await loop.run_in_executor(self.executor, call)
+        if loop not in self.semaphores:
+            self.semaphores[loop] = asyncio.Semaphore(self.max_concurrent)
+        async with self.semaphores[loop]:
+            return await loop.run_in_executor(self.executor, call)
 
 
 class SolvingEngine(object):
     """
     Abstract base class for a deduction engine within particular domain
+
+    Engines instrument their solves with instrumented, stage and
+    add_counts. Stats are only gathered while inside collect_stats or when
+    stats hooks are registered (see register_stats_hook), each of which is
+    called with the SolveStats of every solve.
     """
-    pass
+    # the hooks registered with this class itself, replaced rather than
+    # mutated so that registering with one engine never affects another
+    stats_hooks = ()
+
+    @classmethod
+    def register_stats_hook(cls, hook):
+        """
+        Register a function to be called with the SolveStats of every solve
+        made by this engine or its subclasses
+        """
+        cls.stats_hooks = vars(cls).get('stats_hooks', ()) + (hook, )
+
+    @classmethod
+    def unregister_stats_hook(cls, hook):
+        """
+        Unregister a function registered with register_stats_hook, raising
+        a ValueError if it was not registered with this engine
+        """
+        hooks = list(vars(cls).get('stats_hooks', ()))
+        hooks.remove(hook)
+        cls.stats_hooks = tuple(hooks)
+
+    @classmethod
+    def all_stats_hooks(cls):
+        """
+        Return the stats hooks registered with this engine and its bases
+        """
+        return [
+            hook for base in cls.__mro__
+            for hook in vars(base).get('stats_hooks', ())
+        ]
+
+    @classmethod
+    @contextlib.contextmanager
+    def instrumented(cls):
+        """
+        Gather SolveStats for a solve made in the body of a with statement,
+        yielding them (or None if stats are not being gathered)
+
+        Solves nested in another solve add to the stats of the outer one
+        """
+        stats = ACTIVE_STATS.get()
+        if stats is not None:
+            yield stats
+            return
+        collected = COLLECTED_STATS.get()
+        hooks = cls.all_stats_hooks()
+        if collected is None and not hooks:
+            yield None
+            return
+        stats = SolveStats(cls)
+        token = ACTIVE_STATS.set(stats)
+        start = time.perf_counter()
+        try:
+            yield stats
+        finally:
+            stats.add_time('total', time.perf_counter() - start)
+            ACTIVE_STATS.reset(token)
+        if collected is not None:
+            collected.append(stats)
+        for hook in hooks:
+            hook(stats)
+
+    @staticmethod
+    @contextlib.contextmanager
+    def stage(name):
+        """
+        Time the body of a with statement as a stage of the solve in
+        progress (the time of a stage nested in another is also counted in
+        the outer stage)
+        """
+        stats = ACTIVE_STATS.get()
+        if stats is None:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stats.add_time(name, time.perf_counter() - start)
+
+    @staticmethod
+    def add_counts(**counts):
+        """
+        Add to the counts of the solve in progress
+        """
+        stats = ACTIVE_STATS.get()
+        if stats is not None:
+            stats.add_counts(**counts)
+
+    @staticmethod
+    def collecting():
+        """
+        Return whether stats are being gathered for the solve in progress
+        """
+        return ACTIVE_STATS.get() is not None
+
+    @classmethod
+    def solve_equation_set(cls, eq_set, **kwargs):
+        """
+        Return a dict mapping the variables of an equation set to their
+        solutions
+        """
+        raise NotImplementedError(cls)
@@ -1,6 +1,7 @@
 """
 Tools for expressing the relation of equation
 """
+import importlib
 import inspect
 
 from replicate.replicable import preprocessor
@@ -74,5 +75,18 @@ class EquationSet(set):
         """
         return set().union(*(equation.variables for equation in self))
 
+    def compile(self, engine=None):
+        """
+        Return the EquationSet compiled into a LinearSystem by a solving
+        engine (the LinearEngine by default)
+
+        Compilations are cached by the engine so compiling a structurally
+        identical EquationSet again is cheap
+        """
+        if engine is None:
+            linear = importlib.import_module("pivot.deduction.linear")
+            engine = linear.LinearEngine
+        return engine.compile_equation_set(self)
+
     # TODO consier adding just "from_def" which will evaluate function
     # body as if it were a set of equations
@@ -2,7 +2,10 @@
 Models for symbols and symbolic expressions
 """
 
+import collections.abc
 import importlib
+import itertools
+import weakref
 from fractions import Fraction
 
 from replicate.replicable import Replicable, preprocessor
@@ -10,26 +13,142 @@ from replicate.replicable import Replicable, preprocessor
 PRIMITIVE_EXPRESSION_TYPES = (int, float, Fraction)
 
 
+def interning_key(value):
+    """
+    Return the key under which an argument of an expression is interned
+    """
+    if isinstance(value, Expression):
+        # expressions are themselves interned so are keyed by identity
+        # (which an interned expression keeps alive by holding its arguments)
+        return id(value)
+    if isinstance(value, tuple):
+        return (tuple, tuple(map(interning_key, value)))
+    # primitives are keyed with their types so that 1, 1.0, True and
+    # Fraction(1) remain distinct
+    return (type(value), value)
+
+
+class InterningKey:
+    """
+    The key under which an expression constructed from positional arguments
+    is interned: its class and the interning keys of its arguments
+
+    Hashed incrementally so that the key of an extended expression (see
+    OperationalExpression.extended) follows in constant time from the key
+    of the one it extends
+    """
+    __slots__ = ('cls', 'keys', 'digest')
+
+    def __init__(self, cls, keys, digest):
+        self.cls = cls
+        self.keys = keys
+        self.digest = digest
+
+    @classmethod
+    def of(cls, expression_cls, args):
+        """
+        Return the key of an expression of a class with the given arguments
+        """
+        keys = Arguments(list(map(interning_key, args)), len(args))
+        digest = hash(expression_cls)
+        for key in keys:
+            digest = hash((digest, key))
+        return cls(expression_cls, keys, digest)
+
+    def extended(self, argument):
+        """
+        Return the key of the expression with another argument appended
+        """
+        key = interning_key(argument)
+        return InterningKey(
+            self.cls, self.keys.extended(key), hash((self.digest, key)))
+
+    def __hash__(self):
+        return self.digest
+
+    def __eq__(self, other):
+        if not isinstance(other, InterningKey):
+            return NotImplemented
+        if self.cls is not other.cls or self.digest != other.digest \
+           or len(self.keys) != len(other.keys):
+            return False
+        # keys extended from the same key share its list of argument keys
+        return self.keys.items is other.keys.items or self.keys == other.keys
+
+
 class Expression(Replicable):
     """
     A mathematical expression. May be operationally composed with other expressions
     """
-    __add__ = lambda *args: OperationalExpression('+', *args)
+    __add__ = lambda *args: sum_of(*args)
     __sub__ = lambda *args: OperationalExpression('-', *args)
-    __mul__ = lambda *args: OperationalExpression('*', *args)
+    __mul__ = lambda *args: product_of(*args)
     __truediv__ = lambda *args: OperationalExpression('/', *args)
 
-    __radd__ = lambda *args: OperationalExpression('+', *reversed(args))
+    __radd__ = lambda *args: sum_of(*reversed(args))
     __rsub__ = lambda *args: OperationalExpression('-', *reversed(args))
-    __rmul__ = lambda *args: OperationalExpression('*', *reversed(args))
+    __rmul__ = lambda *args: product_of(*reversed(args))
     __rtruediv__ = lambda *args: OperationalExpression('/', *reversed(args))
 
+    # structurally identical expressions are hash-consed so that each is
+    # only allocated once and usually compares equal by identity
+    interned = weakref.WeakValueDictionary()
+
+    def __new__(cls, *args, **kwargs):
+        base_new = super().__new__
+        construct = lambda: base_new(cls) if base_new is object.__new__ \
+            else base_new(cls, *args, **kwargs)
+        if not args and not kwargs:
+            # e.g. when unpickling or copying
+            return construct()
+        try:
+            if kwargs:
+                key = (cls, tuple(map(interning_key, args)),
+                       frozenset((name, interning_key(value))
+                                 for name, value in kwargs.items()))
+            else:
+                key = InterningKey.of(cls, args)
+            instance = Expression.interned.get(key)
+        except TypeError:
+            return construct()
+        if instance is None:
+            instance = construct()
+            if isinstance(key, InterningKey):
+                vars(instance)['_interning_key'] = key
+            Expression.interned[key] = instance
+        return instance
+
+    def __init__(self, *args, **kwargs):
+        # an interned instance returned again by __new__ keeps the parts it
+        # was first initialized with
+        attributes = vars(self)
+        if attributes.get('_initialized'):
+            return
+        super().__init__(*args, **kwargs)
+        attributes['_initialized'] = True
+        # hashed eagerly (in constant time given the cached hashes of its
+        # arguments) so that hashing a deep expression never recurses
+        try:
+            hash(self)
+        except TypeError:
+            pass
+
     def __hash__(self):
-        return hash(frozenset(self.parts.items()))
+        attributes = vars(self)
+        if '_hash' not in attributes:
+            attributes['_hash'] = hash(frozenset(self.parts.items()))
+        return attributes['_hash']
+
+    def __getstate__(self):
+        # cached hashes of strings are not stable across processes
+        state = vars(self).copy()
+        state.pop('_hash', None)
+        state.pop('_interning_key', None)
+        return state
 
     def __eq__(self, other):
         equation = importlib.import_module("pivot.lexicon.equation")
-        same_exp = super().__eq__(other)
+        same_exp = self is other or super().__eq__(other)
         return equation.Equation(self, other, reflexive=same_exp)
 
     @property
@@ -106,7 +225,8 @@ class VariableAttribute(Variable):
 
 class OperationalExpression(Expression):
     """
-    An operational composition of two expressions
+    An operational composition of expressions (n-ary for the associative
+    operators + and *, binary otherwise)
     """
 
     @preprocessor
@@ -120,6 +240,17 @@ class OperationalExpression(Expression):
         delimiter = " {} ".format(self.operator)
         return delimiter.join(map(repr, self.arguments))
 
+    def __hash__(self):
+        # folded over the arguments so that the hash of an extended
+        # expression follows from the hash of the one it extends
+        attributes = vars(self)
+        if '_hash' not in attributes:
+            digest = hash((OperationalExpression, self.operator))
+            for argument in self.arguments:
+                digest = hash((digest, argument))
+            attributes['_hash'] = digest
+        return attributes['_hash']
+
     @property
     def variables(self):
         """
@@ -129,6 +260,142 @@ class OperationalExpression(Expression):
         expressions = filter(isexpression, self.arguments)
         return set().union(*(arg.variables for arg in expressions))
 
+    def extended(self, argument):
+        """
+        Return the expression applying the operator of this one to its
+        arguments followed by another argument, in constant time by sharing
+        the list of its arguments (see Arguments)
+
+        The expression is interned under the same key as if it were
+        constructed from all of its arguments
+        """
+        try:
+            key = vars(self).get('_interning_key') or InterningKey.of(
+                type(self), (self.operator, *self.arguments))
+            key = key.extended(argument)
+            instance = Expression.interned.get(key)
+        except TypeError:
+            key = instance = None
+        if instance is not None:
+            return instance
+        arguments = self.arguments
+        if not isinstance(arguments, Arguments):
+            arguments = Arguments(list(arguments), len(arguments))
+        parts = dict(self.parts, arguments=arguments.extended(argument))
+        exp = type(self).__new__(type(self))
+        attributes = vars(exp)
+        attributes.update(parts, parts=parts, _initialized=True)
+        try:
+            attributes['_hash'] = hash((hash(self), argument))
+        except TypeError:
+            pass
+        if key is not None:
+            attributes['_interning_key'] = key
+            Expression.interned[key] = exp
+        return exp
+
+
+class Arguments(collections.abc.Sequence):
+    """
+    The arguments of an n-ary OperationalExpression stored as a prefix of a
+    list which may be shared with expressions extending it
+
+    Extending arguments appends to the shared list unless another expression
+    has already extended them, in which case the prefix is copied
+    """
+    __slots__ = ('items', 'length')
+
+    def __init__(self, items, length):
+        self.items = items
+        self.length = length
+
+    def __repr__(self):
+        return repr(tuple(self))
+
+    def __reduce__(self):
+        return (tuple, (tuple(self), ))
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        return itertools.islice(self.items, self.length)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return tuple(self)[index]
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError(index)
+        return self.items[index]
+
+    def __eq__(self, other):
+        if not isinstance(other, (tuple, Arguments)):
+            return NotImplemented
+        return len(self) == len(other) and all(
+            mine is theirs or mine == theirs
+            for mine, theirs in zip(self, other))
+
+    def __hash__(self):
+        return hash(tuple(self))
+
+    def extended(self, item):
+        """
+        Return the arguments followed by another item
+        """
+        items = self.items
+        if len(items) == self.length:
+            items.append(item)
+            # another expression may have been extended concurrently
+            if items[self.length] is item:
+                return Arguments(items, self.length + 1)
+        return Arguments(items[:self.length] + [item], self.length + 1)
+
+
+def is_application(exp, operator):
+    """
+    Return whether an expression is an application of an operator
+    """
+    return isinstance(exp, OperationalExpression) and exp.operator == operator
+
+
+def flattened(operator, operands):
+    """
+    Return an n-ary OperationalExpression applying an associative operator to
+    operands, merging operands which are themselves applications of the same
+    operator into its arguments
+
+    Applying the operator to an application of it and one more operand (as
+    in a + b + c + ...) takes constant time (see
+    OperationalExpression.extended)
+    """
+    if len(operands) == 2 and is_application(operands[0], operator) \
+       and not is_application(operands[1], operator):
+        return operands[0].extended(operands[1])
+    arguments = []
+    for operand in operands:
+        if is_application(operand, operator):
+            arguments.extend(operand.arguments)
+        else:
+            arguments.append(operand)
+    return OperationalExpression(operator, *arguments)
+
+
+def sum_of(*terms):
+    """
+    Return an expression for the sum of terms as a single n-ary sum
+    """
+    return flattened('+', terms)
+
+
+def product_of(*factors):
+    """
+    Return an expression for the product of factors as a single n-ary
+    product
+    """
+    return flattened('*', factors)
+
 
 class Vector(Expression):
     """
@@ -0,0 +1,401 @@
+"""
+Vector and Matrix objects backed by numpy arrays
+
+ArrayVector and ArrayMatrix have the same point-wise semantics as
+matrix.Vector and matrix.Matrix but operate on whole arrays at once. Float
+and integer elements are stored in native numpy arrays while elements of
+custom fields (e.g. Fractions) are stored in arrays of object dtype so that
+their own arithmetic is used. Note that, unlike python integers, integers
+stored natively may overflow.
+"""
+
+import collections.abc
+
+import numpy
+
+from pivot.ontology import matrix
+from pivot.ontology import plane
+
+
+def as_array(items, ndim):
+    """
+    Return items as a numpy array with ndim dimensions, falling back to
+    object dtype when they are not plain numbers
+    """
+    if isinstance(items, (ArrayVector, ArrayMatrix)):
+        return items.data
+    data = numpy.asarray(items)
+    if data.ndim == ndim and data.dtype.kind in 'biufcO':
+        return data
+    rows = [list(row) for row in items] if ndim == 2 else list(items)
+    shape = (len(rows), len(rows[0]) if rows else 0) if ndim == 2 \
+        else (len(rows), )
+    data = numpy.empty(shape, dtype=object)
+    for index, row in enumerate(rows):
+        if ndim == 2:
+            for column, elem in enumerate(row):
+                data[index, column] = elem
+        else:
+            data[index] = row
+    return data
+
+
+def divide_array(data, divisor):
+    """
+    Divide every element of an array like matrix.divide, keeping integer
+    arrays exact by dividing into Fractions when necessary
+    """
+    if data.dtype.kind in 'biu' and isinstance(divisor, int):
+        if not (data % divisor).any():
+            return data // divisor
+        data = data.astype(object)
+    if data.dtype == object:
+        return numpy.frompyfunc(matrix.divide, 2, 1)(data, divisor)
+    return data / divisor
+
+
+class ArrayVector(object):
+    """
+    A Vector whose elements are stored in a one dimensional numpy array
+    """
+    __array_priority__ = 1000
+
+    def __init__(self, items):
+        self.data = as_array(items, 1)
+
+    @classmethod
+    def from_data(cls, data):
+        """
+        Return an ArrayVector wrapping a numpy array without copying it
+        """
+        vector = cls.__new__(cls)
+        vector.data = data
+        return vector
+
+    def __repr__(self):
+        return "{}({!r})".format(type(self).__name__, self.data.tolist())
+
+    def __len__(self):
+        return len(self.data)
+
+    def __iter__(self):
+        return iter(self.data.tolist())
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.from_data(self.data[index])
+        return self.data[index].item() if self.data.dtype != object \
+            else self.data[index]
+
+    def __eq__(self, other):
+        if isinstance(other, (ArrayVector, matrix.Vector, list, tuple)):
+            return len(self) == len(other) and all(
+                a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(tuple(self))
+
+    def __add__(self, other):
+        return self.from_data(self.data + as_array(other, 1))
+
+    def __sub__(self, other):
+        return self.from_data(self.data - as_array(other, 1))
+
+    def __neg__(self):
+        return self.from_data(-self.data)
+
+    def __truediv__(self, divisor):
+        return self.from_data(divide_array(self.data, divisor))
+
+    def __mul__(self, other):
+        """
+        Return the dot product with another vector, the product with a
+        matrix (as a row) or the product with a scalar
+        """
+        if isinstance(other, (ArrayMatrix, matrix.Matrix)):
+            return self.from_data(self.data.dot(as_array(other, 2)))
+        if isinstance(other, (ArrayVector, matrix.Vector)):
+            result = self.data.dot(as_array(other, 1))
+            return result.item() if isinstance(result, numpy.generic) \
+                else result
+        return self.from_data(self.data * other)
+
+    def __rmul__(self, other):
+        if isinstance(other, matrix.Matrix):
+            return self.from_data(as_array(other, 2).dot(self.data))
+        if isinstance(other, matrix.Vector):
+            return self * other
+        return self.from_data(other * self.data)
+
+    __matmul__ = __mul__
+
+    def to_vector(self):
+        """
+        Return the elements as a matrix.Vector
+        """
+        return matrix.Vector(self)
+
+
+class ArrayMatrix(object):
+    """
+    A Matrix whose elements are stored in a two dimensional numpy array
+    """
+    __array_priority__ = 1000
+
+    def __init__(self, rows):
+        self.data = as_array(rows, 2)
+
+    @classmethod
+    def from_data(cls, data):
+        """
+        Return an ArrayMatrix wrapping a numpy array without copying it
+        """
+        mat = cls.__new__(cls)
+        mat.data = data
+        return mat
+
+    def __repr__(self):
+        return "{}({!r})".format(type(self).__name__, self.data.tolist())
+
+    def __len__(self):
+        return len(self.data)
+
+    def __iter__(self):
+        return (ArrayVector.from_data(row) for row in self.data)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.from_data(self.data[index])
+        return ArrayVector.from_data(self.data[index])
+
+    def __eq__(self, other):
+        if isinstance(other, (ArrayMatrix, matrix.Vector, list, tuple)):
+            return len(self) == len(other) and all(
+                a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(tuple(map(tuple, self)))
+
+    def __add__(self, other):
+        return self.from_data(self.data + as_array(other, 2))
+
+    def __sub__(self, other):
+        return self.from_data(self.data - as_array(other, 2))
+
+    def __neg__(self):
+        return self.from_data(-self.data)
+
+    def __truediv__(self, divisor):
+        return self.from_data(divide_array(self.data, divisor))
+
+    def __mul__(self, other):
+        """
+        Return the product of the matrix and another matrix, a vector (as a
+        column) or a scalar
+        """
+        if isinstance(other, (ArrayMatrix, matrix.Matrix)):
+            return self.from_data(self.data.dot(as_array(other, 2)))
+        if isinstance(other, (ArrayVector, matrix.Vector)):
+            return ArrayVector.from_data(self.data.dot(as_array(other, 1)))
+        return self.from_data(self.data * other)
+
+    def __rmul__(self, other):
+        if isinstance(other, matrix.Matrix):
+            return self.from_data(as_array(other, 2).dot(self.data))
+        if isinstance(other, matrix.Vector):
+            return ArrayVector.from_data(as_array(other, 1).dot(self.data))
+        return self.from_data(other * self.data)
+
+    __matmul__ = __mul__
+
+    @property
+    def shape(self):
+        """
+        Return the number of rows and number of columns of the matrix
+        """
+        return self.data.shape
+
+    @property
+    def transpose(self):
+        """
+        Return the transpose of the matrix (a view sharing its elements)
+        """
+        return self.from_data(self.data.T)
+
+    @property
+    def reduced_form(self):
+        """
+        Return the reduced form of the matrix
+        """
+        return type(self)(matrix.reduced_rows(self.data.tolist()))
+
+    def to_matrix(self):
+        """
+        Return the elements as a matrix.Matrix
+        """
+        return matrix.Matrix(self.data.tolist())
+
+
+class VectorArray(object):
+    """
+    The vectors of a list of variables (e.g. the solutions of a system of
+    vector equations) stored as one contiguous array per coordinate
+
+    A VectorArray can be used like a read-only dict mapping variables to
+    vectors while its arithmetic applies to every vector at once
+    """
+    __slots__ = ('variables', 'index', 'coordinates', 'vector_class')
+
+    def __init__(self, variables, coordinates, vector_class=matrix.Vector):
+        self.variables = list(variables)
+        self.index = {variable: position
+                      for position, variable in enumerate(self.variables)}
+        self.coordinates = numpy.ascontiguousarray(as_array(coordinates, 2))
+        self.vector_class = vector_class
+
+    @classmethod
+    def from_dict(cls, vectors, *args):
+        """
+        Return a VectorArray of the vectors in a dict
+        """
+        return cls(list(vectors), list(zip(*vectors.values())), *args)
+
+    def with_coordinates(self, coordinates):
+        """
+        Return a VectorArray of the same variables with other coordinates
+        """
+        vectors = type(self).__new__(type(self))
+        vectors.variables = self.variables
+        vectors.index = self.index
+        vectors.coordinates = coordinates
+        vectors.vector_class = self.vector_class
+        return vectors
+
+    def __repr__(self):
+        return "{}({!r})".format(type(self).__name__, self.to_dict())
+
+    def __len__(self):
+        return len(self.variables)
+
+    def __iter__(self):
+        return iter(self.variables)
+
+    def __contains__(self, variable):
+        return variable in self.index
+
+    def __getitem__(self, variable):
+        return self.vector_class(
+            self.coordinates[:, self.index[variable]].tolist())
+
+    def __eq__(self, other):
+        if isinstance(other, (VectorArray, dict)):
+            return len(self) == len(other) and all(
+                variable in other and self[variable] == other[variable]
+                for variable in self)
+        return NotImplemented
+
+    __hash__ = None
+
+    def get(self, variable, default=None):
+        """
+        Return the vector of a variable or a default if it has none
+        """
+        return self[variable] if variable in self.index else default
+
+    def keys(self):
+        """
+        Return the variables in order
+        """
+        return list(self.variables)
+
+    def values(self):
+        """
+        Return the vectors in the order of the variables
+        """
+        return [
+            self.vector_class(values)
+            for values in zip(*self.coordinates.tolist())
+        ]
+
+    def items(self):
+        """
+        Return (variable, vector) pairs in the order of the variables
+        """
+        return list(zip(self.variables, self.values()))
+
+    def to_dict(self):
+        """
+        Return a dict mapping each variable to its vector
+        """
+        return dict(self.items())
+
+    def to_numpy(self):
+        """
+        Return an array with one row per variable and one column per
+        coordinate which shares the memory of the VectorArray
+        """
+        return self.coordinates.T
+
+    def aligned(self, other):
+        """
+        Return the coordinates of another VectorArray (ordered like this
+        one), a vector (broadcast to every variable) or a scalar
+        """
+        if isinstance(other, VectorArray):
+            if other.variables == self.variables:
+                return other.coordinates
+            return other.coordinates[:, [
+                other.index[variable] for variable in self.variables
+            ]]
+        if isinstance(other, (matrix.Vector, ArrayVector, list, tuple)):
+            return as_array(other, 1)[:, None]
+        return other
+
+    def __add__(self, other):
+        return self.with_coordinates(self.coordinates + self.aligned(other))
+
+    def __sub__(self, other):
+        return self.with_coordinates(self.coordinates - self.aligned(other))
+
+    def __neg__(self):
+        return self.with_coordinates(-self.coordinates)
+
+    def __mul__(self, scalar):
+        return self.with_coordinates(self.coordinates * scalar)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, divisor):
+        return self.with_coordinates(divide_array(self.coordinates, divisor))
+
+
+class PlaneVectorArray(VectorArray):
+    """
+    A VectorArray of PlaneVectors whose x and y coordinates are each stored
+    contiguously
+    """
+    __slots__ = ()
+
+    def __init__(self, variables, coordinates, vector_class=plane.PlaneVector):
+        super().__init__(variables, coordinates, vector_class)
+
+    @property
+    def x(self):
+        """
+        The array of the first coordinates of the vectors
+        """
+        return self.coordinates[0]
+
+    @property
+    def y(self):
+        """
+        The array of the second coordinates of the vectors
+        """
+        return self.coordinates[1]
+
+
+# registered so that matrix.Vector and matrix.Matrix defer to these classes
+collections.abc.Sequence.register(ArrayVector)
+collections.abc.Sequence.register(ArrayMatrix)
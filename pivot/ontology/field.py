@@ -0,0 +1,263 @@
+"""
+Fields of the coefficients of linear systems
+
+A Field supplies the identities of its elements, a test for zero, inverses
+and division along with a kernel solving a whole square system in the
+field for one or more columns of constants. The base Field works with any
+python objects implementing +, - and * while RealField, RationalField and
+PrimeField solve systems of floats, rationals and integers modulo a prime
+with specialized kernels.
+"""
+
+import fractions
+
+from pivot.ontology import matrix
+
+
+def is_prime(n):
+    """
+    Return whether an integer is prime using the Miller-Rabin test with
+    bases which make it deterministic for every n below 3 * 10**24
+    """
+    bases = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+    if n < 2:
+        return False
+    for base in bases:
+        if n % base == 0:
+            return n == base
+    odd, twos = n - 1, 0
+    while odd % 2 == 0:
+        odd, twos = odd // 2, twos + 1
+    for base in bases:
+        x = pow(base, odd, n)
+        if x in (1, n - 1):
+            continue
+        for _ in range(twos - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+class Field(object):
+    """
+    A field whose elements are python objects combined with the usual
+    arithmetic operators
+    """
+    zero = 0
+    one = 1
+
+    def __repr__(self):
+        return "{}()".format(type(self).__name__)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and vars(self) == vars(other)
+
+    def __hash__(self):
+        return hash((type(self), tuple(sorted(vars(self).items()))))
+
+    def convert(self, value):
+        """
+        Return a value (e.g. a parsed integer or rational coefficient) as an
+        element of the field
+        """
+        return value
+
+    def is_zero(self, x):
+        """
+        Return whether an element is the additive identity
+        """
+        return x == x - x
+
+    def inverse(self, x):
+        """
+        Return the multiplicative inverse of a nonzero element
+        """
+        return self.divide(self.one, x)
+
+    def divide(self, x, y):
+        """
+        Return the quotient of two elements
+        """
+        return x / y
+
+    def eliminate(self, rows):
+        """
+        Return the solutions of a square system given as the rows of its
+        augmented matrix, raising a ValueError if it has no unique solution
+        """
+        if any(len(row) != len(rows) + 1 for row in rows):
+            raise ValueError("Only square systems can be eliminated")
+        return self.eliminate_columns(rows)[0]
+
+    def eliminate_columns(self, rows):
+        """
+        Return a list of the solutions of a square system for each column of
+        constants given the rows of its coefficient matrix augmented with
+        any number of such columns
+
+        Every row with a nonzero entry in the pivot column is reduced by a
+        multiple of the whole pivot row in turn.
+        """
+        rows = [[self.convert(elem) for elem in row] for row in rows]
+        size = len(rows)
+        if any(len(row) <= size for row in rows):
+            raise ValueError("Only square systems can be eliminated")
+        for column in range(size):
+            for pivot_index in range(column, size):
+                if not self.is_zero(rows[pivot_index][column]):
+                    break
+            else:
+                raise ValueError("Irredecuble rows")
+            rows[column], rows[pivot_index] = rows[pivot_index], rows[column]
+            pivot_row = rows[column]
+            inverse = self.inverse(pivot_row[column])
+            pivot_row[column:] = [
+                self.convert(elem * inverse) for elem in pivot_row[column:]
+            ]
+            for other_index, row in enumerate(rows):
+                factor = row[column]
+                if other_index == column or self.is_zero(factor):
+                    continue
+                row[column:] = [
+                    self.convert(elem - factor * pivot_elem)
+                    for elem, pivot_elem in zip(row[column:],
+                                                pivot_row[column:])
+                ]
+        width = len(rows[0]) if rows else size + 1
+        return [[row[column] for row in rows]
+                for column in range(size, width)]
+
+
+class RealField(Field):
+    """
+    The field of real numbers approximated by floats, whose systems are
+    solved with numpy
+    """
+    zero = 0.0
+    one = 1.0
+
+    def convert(self, value):
+        return float(value)
+
+    def is_zero(self, x):
+        return x == 0
+
+    def eliminate_columns(self, rows):
+        from numpy import array
+        from numpy.linalg import solve
+        data = array(rows, dtype=float)
+        size = len(data)
+        if data.ndim != 2 or data.shape[1] <= size:
+            raise ValueError("Only square systems can be eliminated")
+        return solve(data[:, :size], data[:, size:]).T.tolist()
+
+
+class RationalField(Field):
+    """
+    The field of rational numbers represented exactly by integers and
+    Fractions, whose systems are solved by fraction-free elimination
+    """
+
+    def convert(self, value):
+        if isinstance(value, (int, fractions.Fraction)):
+            return value
+        return fractions.Fraction(value)
+
+    def is_zero(self, x):
+        return x == 0
+
+    def divide(self, x, y):
+        return matrix.divide(x, y)
+
+    def eliminate_columns(self, rows):
+        rows = [[self.convert(elem) for elem in row] for row in rows]
+        if any(len(row) <= len(rows) for row in rows):
+            raise ValueError("Only square systems can be eliminated")
+        return matrix.fraction_free_solve_columns(rows)
+
+
+class PrimeField(Field):
+    """
+    The field GF(p) of integers modulo a prime p
+
+    Elements are represented by python integers which are reduced modulo p
+    by convert, is_zero and divide. Systems are eliminated with vectorized
+    modular arithmetic on numpy arrays of integers (of exclusive or on
+    arrays of bytes for GF(2)).
+    """
+
+    # the largest modulus whose products fit into 64 bit integers
+    MAXIMUM_NATIVE_MODULUS = 2**31
+
+    def __init__(self, p):
+        if not is_prime(p):
+            raise ValueError("{} is not prime".format(p))
+        self.p = p
+
+    def __repr__(self):
+        return "PrimeField({})".format(self.p)
+
+    def convert(self, value):
+        if isinstance(value, int):
+            return value % self.p
+        value = fractions.Fraction(value)
+        if value.denominator % self.p == 0:
+            raise ValueError("{} is not representable in GF({})".format(
+                value, self.p))
+        return value.numerator * self.inverse(value.denominator) % self.p
+
+    def is_zero(self, x):
+        return x % self.p == 0
+
+    def inverse(self, x):
+        try:
+            return pow(x, -1, self.p)
+        except ValueError:
+            raise ZeroDivisionError("{} is not invertible modulo {}".format(
+                x, self.p))
+
+    def divide(self, x, y):
+        return self.convert(x) * self.inverse(self.convert(y)) % self.p
+
+    def eliminate_columns(self, rows):
+        from numpy import array, flatnonzero, int64, outer, uint8
+        p = self.p
+        if p == 2:
+            dtype = uint8
+        elif p < self.MAXIMUM_NATIVE_MODULUS:
+            dtype = int64
+        else:
+            dtype = object
+        data = array([[self.convert(elem) for elem in row] for row in rows],
+                     dtype=dtype)
+        size = len(data)
+        if data.ndim != 2 or data.shape[1] <= size:
+            raise ValueError("Only square systems can be eliminated")
+        for column in range(size):
+            candidates = flatnonzero(data[column:, column])
+            if not len(candidates):
+                raise ValueError("Irredecuble rows")
+            pivot_index = column + candidates[0]
+            if pivot_index != column:
+                data[[column, pivot_index]] = data[[pivot_index, column]]
+            pivot_row = data[column, column:]
+            if p != 2:
+                pivot_row[:] = pivot_row * self.inverse(int(pivot_row[0])) % p
+            others = flatnonzero(data[:, column])
+            others = others[others != column]
+            if not len(others):
+                continue
+            if p == 2:
+                data[others, column:] ^= pivot_row
+            else:
+                data[others, column:] = (data[others, column:] - outer(
+                    data[others, column], pivot_row)) % p
+        return [[int(value) for value in column]
+                for column in data[:, size:].T]
+
+
+REALS = RealField()
+RATIONALS = RationalField()
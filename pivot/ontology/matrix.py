@@ -2,7 +2,11 @@
 Matrix object and related tools
 """
 
+import collections
+import collections.abc
 import fractions
+import heapq
+import math
 
 
 def dot_product(v1, v2):
@@ -27,14 +31,10 @@ def ensure_good_pivot(rows, row_index):
     Return an input list of rows with swapping done to ensure a good
     pivot point for a particular row
     """
-    row = rows[row_index]
-    pivot_point = row[row_index]
-    # more general test for additive identity
-    if pivot_point != -pivot_point:
+    if not is_additive_identity(rows[row_index][row_index]):
         return rows
     for swap_index in range(row_index + 1, len(rows)):
-        new_pivot = rows[swap_index][row_index]
-        if new_pivot != -new_pivot:
+        if not is_additive_identity(rows[swap_index][row_index]):
             return swap(rows, row_index, swap_index)
     raise ValueError("Irredecuble rows")
 
@@ -51,27 +51,359 @@ def divide(x, y):
     return x / y
 
 
+def is_additive_identity(x):
+    """
+    Return whether an element is the additive identity of its field
+    """
+    # x == -x would also hold for every element of a field of characteristic
+    # 2, in which every element is its own negation
+    return x == x - x
+
+
+def magnitude(x):
+    """
+    Return a key by which to rank candidate pivots (larger is better)
+    """
+    try:
+        return abs(x)
+    except TypeError:
+        return 0
+
+
+def choose_pivot(rows, row_index, column_index):
+    """
+    Return the index of the row (at or below row_index) whose entry in the
+    given column makes the best pivot or None if all such entries are zero
+    """
+    best_index = None
+    best_magnitude = None
+    for index in range(row_index, len(rows)):
+        entry = rows[index][column_index]
+        if is_additive_identity(entry):
+            continue
+        entry_magnitude = magnitude(entry)
+        if best_index is None or entry_magnitude > best_magnitude:
+            best_index = index
+            best_magnitude = entry_magnitude
+    return best_index
+
+
+def eliminate_column(rows, row_index, column_index):
+    """
+    Scale the pivot row so that its pivot is the multiplicative identity and
+    eliminate the pivot column from every other row that has a nonzero entry
+    in it. Rows are mutated in place.
+    """
+    pivot_row = rows[row_index]
+    pivot_point = pivot_row[column_index]
+    support = [
+        index for index in range(column_index, len(pivot_row))
+        if not is_additive_identity(pivot_row[index])
+    ]
+    for index in support:
+        pivot_row[index] = divide(pivot_row[index], pivot_point)
+    for other_index, row in enumerate(rows):
+        if other_index == row_index:
+            continue
+        factor = row[column_index]
+        if is_additive_identity(factor):
+            continue
+        for index in support:
+            row[index] = row[index] - factor * pivot_row[index]
+
+
+def reduce_rows_in_place(rows, start_row_index=0, width=None):
+    """
+    Iteratively reduce the square part of a matrix given as a list of
+    mutable rows to the identity matrix using partial pivoting
+
+    Given the width of the coefficients of a matrix with more rows than
+    that (an overdetermined system) only its first width columns are
+    reduced, raising a ValueError unless the rows left over are then zero
+    (i.e. unless the system is consistent)
+    """
+    if width is None:
+        width = len(rows)
+    for row_index in range(start_row_index, min(width, len(rows))):
+        pivot_index = choose_pivot(rows, row_index, row_index)
+        if pivot_index is None:
+            raise ValueError("Irredecuble rows")
+        if pivot_index != row_index:
+            rows[row_index], rows[pivot_index] = \
+                rows[pivot_index], rows[row_index]
+        eliminate_column(rows, row_index, row_index)
+    for row in rows[width:]:
+        if not all(map(is_additive_identity, row)):
+            raise ValueError("Inconsistent rows")
+    return rows
+
+
+def rank_reduce_in_place(rows, width):
+    """
+    Reduce the first width columns of a matrix of any shape (given as a list
+    of mutable rows) to reduced row echelon form using partial pivoting and
+    return the list of pivot columns. Rows past the number of pivots are
+    left with only additive identities in their first width columns.
+    """
+    pivots = []
+    for column_index in range(width):
+        row_index = len(pivots)
+        if row_index == len(rows):
+            break
+        pivot_index = choose_pivot(rows, row_index, column_index)
+        if pivot_index is None:
+            continue
+        if pivot_index != row_index:
+            rows[row_index], rows[pivot_index] = \
+                rows[pivot_index], rows[row_index]
+        eliminate_column(rows, row_index, column_index)
+        pivots.append(column_index)
+    return pivots
+
+
 def reduced_rows(rows, start_row_index=0):
     """
     Reduce a matrix to the identity matrix
     """
-    if start_row_index >= len(rows):
-        return rows
+    mutable_rows = [list(row) for row in rows]
+    reduce_rows_in_place(mutable_rows, start_row_index)
+    return [Vector(row) for row in mutable_rows]
+
+
+def minimum_degree_order(rows, width):
+    """
+    Return a list of column indices ordering the elimination of a sparse
+    matrix (given as a list of dicts mapping column indices to entries) so
+    as to keep fill-in small
+
+    Each step symbolically eliminates the remaining column with the fewest
+    entries using the shortest row containing it. Ties are broken by index
+    so the order only depends on the order of the rows and columns.
+    """
+    row_columns = [set(row) for row in rows]
+    column_rows = [set() for _ in range(width)]
+    for index, columns in enumerate(row_columns):
+        for column in columns:
+            column_rows[column].add(index)
+    heap = [(len(indices), column)
+            for column, indices in enumerate(column_rows)]
+    heapq.heapify(heap)
+    order = []
+    while heap:
+        count, column = heapq.heappop(heap)
+        if count != len(column_rows[column]) or not count:
+            continue
+        pivot_index = min(column_rows[column],
+                          key=lambda index: (len(row_columns[index]), index))
+        pivot_columns = row_columns[pivot_index]
+        pivot_columns.discard(column)
+        for index in column_rows[column]:
+            if index == pivot_index:
+                continue
+            columns = row_columns[index]
+            columns.discard(column)
+            for fill in pivot_columns - columns:
+                columns.add(fill)
+                column_rows[fill].add(index)
+        for other in pivot_columns:
+            column_rows[other].discard(pivot_index)
+            heapq.heappush(heap, (len(column_rows[other]), other))
+        column_rows[column] = set()
+        order.append(column)
+    return order
+
+
+def symbolic_fill_in(rows, order):
+    """
+    Return the number of entries created when eliminating the columns of a
+    sparse matrix (given as a list of dicts mapping column indices to
+    entries) in the given order, choosing pivot rows like sparse_solve and
+    ignoring any cancellation
+    """
+    row_columns = [set(row) for row in rows]
+    column_rows = collections.defaultdict(set)
+    for index, columns in enumerate(row_columns):
+        for column in columns:
+            column_rows[column].add(index)
+    fill_in = 0
+    for column in order:
+        if not column_rows[column]:
+            break
+        index = min(column_rows[column],
+                    key=lambda index: (len(row_columns[index]), index))
+        pivot_columns = row_columns[index] - {column}
+        column_rows[column].discard(index)
+        for other_index in column_rows.pop(column):
+            columns = row_columns[other_index]
+            columns.discard(column)
+            for fill in pivot_columns - columns:
+                columns.add(fill)
+                column_rows[fill].add(other_index)
+                fill_in += 1
+        for other in pivot_columns:
+            column_rows[other].discard(index)
+    return fill_in
+
+
+def sparse_solve(rows, constants, order):
+    """
+    Return the solutions of a square system given as a list of dicts mapping
+    column indices to entries and a list of constants, found by eliminating
+    the columns in the given order followed by back substitution, or None
+    if the system is singular
+
+    Each column is eliminated using the shortest remaining row in which it
+    has a nonzero entry. Only entries which are present are ever touched,
+    so the work done depends on the fill-in permitted by the order.
+    """
+    solutions = sparse_solve_columns(rows, [constants], order)
+    return None if solutions is None else solutions[0]
+
+
+def sparse_solve_columns(rows, columns, order):
+    """
+    Return a list of the solutions of a square sparse system (see
+    sparse_solve) for each of several columns of constants, eliminating its
+    entries only once, or None if the system is singular
+    """
+    if len(order) != len(rows):
+        return None
+    rows = [{
+        column: entry
+        for column, entry in row.items() if not is_additive_identity(entry)
+    } for row in rows]
+    constants = [list(row_constants) for row_constants in zip(*columns)] \
+        if columns else [[] for _ in rows]
+    column_rows = collections.defaultdict(set)
+    for index, row in enumerate(rows):
+        for column in row:
+            column_rows[column].add(index)
+    pivots = []
+    for column in order:
+        if not column_rows[column]:
+            return None
+        index = min(column_rows[column],
+                    key=lambda index: (len(rows[index]), index))
+        pivots.append((index, column))
+        pivot_row = rows[index]
+        pivot_point = pivot_row[column]
+        column_rows[column].discard(index)
+        for other_index in column_rows.pop(column):
+            row = rows[other_index]
+            factor = divide(row.pop(column), pivot_point)
+            for other, entry in pivot_row.items():
+                if other == column:
+                    continue
+                if other in row:
+                    row[other] = row[other] - factor * entry
+                    if is_additive_identity(row[other]):
+                        del row[other]
+                        column_rows[other].discard(other_index)
+                else:
+                    row[other] = -(factor * entry)
+                    column_rows[other].add(other_index)
+            constants[other_index] = [
+                constant - factor * pivot_constant
+                for constant, pivot_constant in zip(constants[other_index],
+                                                    constants[index])
+            ]
+        for other in pivot_row:
+            column_rows[other].discard(index)
+    solutions = [[None] * len(rows) for _ in columns]
+    for index, column in reversed(pivots):
+        for position, vector in enumerate(solutions):
+            total = constants[index][position]
+            for other, entry in rows[index].items():
+                if other != column:
+                    total = total - entry * vector[other]
+            vector[column] = divide(total, rows[index][column])
+    return solutions
+
+
+def row_scale(row):
+    """
+    Return the smallest positive integer which scales a row of rational
+    numbers to a row of integers
+    """
+    scale = 1
+    for elem in row:
+        denominator = fractions.Fraction(elem).denominator
+        scale = scale * denominator // math.gcd(scale, denominator)
+    return scale
+
+
+def integer_row(row):
+    """
+    Return a row of rational numbers scaled to a row of integers
+    """
+    scale = row_scale(row)
+    return [int(fractions.Fraction(elem) * scale) for elem in row]
+
+
+def fraction_free_reduce_in_place(rows):
+    """
+    Reduce the square part of a matrix of integers (given as a list of
+    mutable rows) to a multiple of the identity matrix using Bareiss'
+    fraction-free elimination. Every intermediate entry is an integer and
+    all divisions are exact. Returns the common diagonal entry, which is
+    the determinant of the square part up to sign.
+    """
+    previous = 1
+    for row_index in range(len(rows)):
+        for pivot_index in range(row_index, len(rows)):
+            if rows[pivot_index][row_index]:
+                break
+        else:
+            raise ValueError("Irredecuble rows")
+        if pivot_index != row_index:
+            rows[row_index], rows[pivot_index] = \
+                rows[pivot_index], rows[row_index]
+        pivot_row = rows[row_index]
+        pivot_point = pivot_row[row_index]
+        for other_index, row in enumerate(rows):
+            if other_index == row_index:
+                continue
+            factor = row[row_index]
+            for index, elem in enumerate(row):
+                row[index] = (pivot_point * elem -
+                              factor * pivot_row[index]) // previous
+        previous = pivot_point
+    return previous
+
+
+def fraction_free_solve(rows):
+    """
+    Return the solutions of a system given as the rows of a rational
+    augmented matrix, performing a single division per variable
+    """
+    return fraction_free_solve_columns(rows)[-1]
 
-    rows = ensure_good_pivot(rows, start_row_index)
-    pivot_point = rows[start_row_index][start_row_index]
-    pivot_row = rows[start_row_index] / pivot_point
 
-    new_rows = [(row - (pivot_row * row[start_row_index])) for row in rows]
-    new_rows[start_row_index] = pivot_row
-    return reduced_rows(new_rows, start_row_index + 1)
+def fraction_free_solve_columns(rows):
+    """
+    Return a list of the solutions of a square system given as the rows of
+    a rational matrix augmented with any number of columns of constants,
+    one for each column, reducing the coefficients only once
+    """
+    size = len(rows)
+    integer_rows = list(map(integer_row, rows))
+    determinant = fraction_free_reduce_in_place(integer_rows)
+    width = len(integer_rows[0]) if integer_rows else size + 1
+    return [[divide(row[column], determinant) for row in integer_rows]
+            for column in range(size, width)]
 
 
 def vector_product(v1, v2):
     """
     Return the dot-product of two vectors and the scalar product
     of a vector and a scaler
+
+    Other sequences (e.g. array-backed vectors) are left to implement the
+    product themselves
     """
+    if isinstance(v2, collections.abc.Sequence) \
+       and not isinstance(v2, Vector):
+        return NotImplemented
     if not isinstance(v1, Vector):
         return type(v2)(elem * v1 for elem in v2)
     if not isinstance(v2, Vector):
@@ -98,12 +430,51 @@ class Matrix(Vector):
     """
 
     def __new__(cls, rows):
+        rows = list(rows)
         cls.validate(rows)
         return super().__new__(cls, map(Vector, rows))
 
     def __mul__(self, other):
-        # TODO implement
-        pass
+        """
+        Return the product of the matrix and another matrix, a vector (as a
+        column) or a scalar
+        """
+        if isinstance(other, Matrix):
+            columns = other.transpose
+            return Matrix([
+                [dot_product(row, column) for column in columns]
+                for row in self
+            ])
+        elif isinstance(other, Vector):
+            return Vector(dot_product(row, other) for row in self)
+        elif isinstance(other, collections.abc.Sequence):
+            return NotImplemented
+        return Matrix(row * other for row in self)
+
+    def __rmul__(self, other):
+        """
+        Return the product of a vector (as a row) or a scalar and the matrix
+        """
+        if isinstance(other, Vector):
+            return Vector(dot_product(other, column)
+                          for column in self.transpose)
+        elif isinstance(other, collections.abc.Sequence):
+            return NotImplemented
+        return Matrix(other * row for row in self)
+
+    @property
+    def shape(self):
+        """
+        Return the number of rows and number of columns of the matrix
+        """
+        return len(self), len(self[0]) if self else 0
+
+    @property
+    def transpose(self):
+        """
+        Return the transpose of the matrix
+        """
+        return Matrix(zip(*self))
 
     @staticmethod
     def validate(rows):
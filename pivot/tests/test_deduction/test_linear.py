@@ -3,11 +3,17 @@ Unit tests for the linear deduction engine
 """
 
 import unittest
+from fractions import Fraction
 
 from pivot.deduction import linear
+from pivot.interface import deducer
 from pivot.interface.shortcuts import PV, V
 from pivot.lexicon import equation
 from pivot.lexicon import expression
+from pivot.ontology import array
+from pivot.ontology import field
+from pivot.ontology import matrix
+from pivot.ontology import plane
 
 
 class SumOfProductsTestCase(unittest.TestCase):
@@ -70,6 +76,47 @@ class BasicExpressionComposition(SumOfProductsTestCase):
         sop = linear.SumOfProducts.from_expression((2 * x + 3 * y + x) / 3)
         self.assertEqual(sop.coefficients, {x: 1, y: 1})
 
+    def test_long_sum(self):
+        """
+        Test parsing a sum with more terms than the recursion limit
+        """
+        variables = [expression.Variable("x{}".format(i)) for i in range(5000)]
+        sop = linear.SumOfProducts.from_expression(
+            expression.sum_of(*variables) + variables[0])
+        self.assertEqual(len(sop.coefficients), 5000)
+        self.assertEqual(sop.coefficients[variables[0]], 2)
+
+
+class InPlaceAccumulation(SumOfProductsTestCase):
+    """
+    Tests of in-place SumOfProducts accumulation
+    """
+
+    def test_in_place_add(self):
+        """
+        Test adding and subtracting in place
+        """
+        x, y = map(expression.Variable, ["x", "y"])
+        sop = linear.SumOfProducts.from_expression(x)
+        coefficients = sop.coefficients
+        sop += linear.SumOfProducts.from_expression(2 * y)
+        sop -= linear.SumOfProducts.from_expression(x + 1)
+        self.assertIs(sop.coefficients, coefficients)
+        self.assertEqual(sop.coefficients, {x: 0, y: 2, 1: -1})
+
+    def test_linearize(self):
+        """
+        Test that linearizing matches parsing the expression tree
+        """
+        x, y = map(expression.Variable, ["x", "y"])
+        exp = (2 * x + 3 * (y - 1) + x) / 3 - Fraction(1, 2) * (x - y / 2)
+        self.assertEqual(
+            linear.SumOfProducts.linearize(exp).coefficients,
+            linear.SumOfProducts.from_expression(exp).coefficients)
+        self.assertEqual(
+            linear.SumOfProducts.linearize(exp).coefficients,
+            {x: Fraction(1, 2), y: Fraction(5, 4), 1: -1})
+
 
 class LinearEngineTestCase(unittest.TestCase):
     """
@@ -106,6 +153,755 @@ class BasicEquationSolving(LinearEngineTestCase):
             eq_set, method=linear.SolutionMethod.BUILTIN)
         self.assertEqual(solutions, {x: -15, y: 8, z: 2})
 
+    def test_overdetermined(self):
+        """
+        test that a consistent overdetermined system is solved and an
+        inconsistent one is rejected rather than solved for its constants
+        """
+        x, y = map(expression.Variable, ["x", "y"])
+        eq_set = equation.EquationSet.from_equations(x == 1, y == 2,
+                                                     x + y == 3)
+        solutions = linear.LinearEngine.solve_equation_set(
+            eq_set, method=linear.SolutionMethod.BUILTIN)
+        self.assertEqual(solutions, {x: 1, y: 2})
+        eq_set = equation.EquationSet.from_equations(x == 1, y == 2,
+                                                     x + y == 4)
+        with self.assertRaises(ValueError):
+            linear.LinearEngine.solve_equation_set(
+                eq_set, method=linear.SolutionMethod.BUILTIN)
+
+    def test_numpy_medium_equation(self):
+        """
+        medium complexity test of linear equation solving with numpy
+        """
+        x, y, z = map(expression.Variable, ["x", "y", "z"])
+        eq_set = equation.EquationSet.from_equations(
+            x == 5 - 3 * y + 2 * z,
+            x == ((7 - 5 * y - 6 * z) / 3),
+            x == ((8 - 4 * y - 3 * z) / 2), )
+        solutions = linear.LinearEngine.solve_equation_set(
+            eq_set, method=linear.SolutionMethod.NUMPY)
+        for variable, value in {x: -15, y: 8, z: 2}.items():
+            self.assertAlmostEqual(solutions[variable], value)
+
+
+class FractionFreeEquationSolving(LinearEngineTestCase):
+    """
+    Test exact linear equation solving with fraction-free elimination
+    """
+
+    def test_medium_equation(self):
+        """
+        medium complexity test of fraction-free linear equation solving
+        """
+        x, y, z = map(expression.Variable, ["x", "y", "z"])
+        eq_set = equation.EquationSet.from_equations(
+            x == 5 - 3 * y + 2 * z,
+            x == ((7 - 5 * y - 6 * z) / 3),
+            x == ((8 - 4 * y - 3 * z) / 2), )
+        solutions = linear.LinearEngine.solve_equation_set(
+            eq_set, method=linear.SolutionMethod.FRACTION_FREE)
+        self.assertEqual(solutions, {x: -15, y: 8, z: 2})
+
+    def test_rational_solution(self):
+        """
+        test a system whose solutions are not integers
+        """
+        x, y = map(expression.Variable, ["x", "y"])
+        eq_set = equation.EquationSet.from_equations(
+            2 * x + 3 * y == 1,
+            4 * x - y == Fraction(1, 2), )
+        solutions = linear.LinearEngine.solve_equation_set(
+            eq_set, method=linear.SolutionMethod.FRACTION_FREE)
+        self.assertEqual(solutions, {x: Fraction(5, 28), y: Fraction(3, 14)})
+
+
+class BinaryEngine(linear.LinearEngine):
+    """
+    A LinearEngine for systems over GF(2)
+    """
+    field = field.PrimeField(2)
+
+
+class SeptenaryEngine(linear.LinearEngine):
+    """
+    A LinearEngine for systems over GF(7)
+    """
+    field = field.PrimeField(7)
+
+
+class FieldEquationSolving(LinearEngineTestCase):
+    """
+    Test solving linear equations in the field of an engine
+    """
+
+    def test_rational_field(self):
+        """
+        test that the default field solves exactly over the rationals
+        """
+        x, y = map(expression.Variable, ["x", "y"])
+        eq_set = equation.EquationSet.from_equations(
+            2 * x + 3 * y == 1,
+            4 * x - y == Fraction(1, 2), )
+        solutions = linear.LinearEngine.solve_equation_set(
+            eq_set, method=linear.SolutionMethod.FIELD)
+        self.assertEqual(solutions, {x: Fraction(5, 28), y: Fraction(3, 14)})
+
+    def test_prime_field(self):
+        """
+        test solving a system with rational coefficients over GF(7)
+        """
+        x, y, z = map(expression.Variable, ["x", "y", "z"])
+        eq_set = equation.EquationSet.from_equations(
+            x == 5 - 3 * y + 2 * z,
+            x == ((7 - 5 * y - 6 * z) / 3),
+            x == ((8 - 4 * y - 3 * z) / 2), )
+        solutions = SeptenaryEngine.solve_equation_set(
+            eq_set, method=linear.SolutionMethod.FIELD)
+        self.assertEqual(solutions, {x: -15 % 7, y: 8 % 7, z: 2})
+
+    def test_binary_field(self):
+        """
+        test solving over GF(2), in which even coefficients vanish
+        """
+        x, y, z = map(expression.Variable, ["x", "y", "z"])
+        eq_set = equation.EquationSet.from_equations(
+            x + y == 1,
+            2 * x + y + z == 1,
+            x + y + z == 0, )
+        for substitute in (True, False):
+            solutions = BinaryEngine.solve_equation_set(
+                eq_set,
+                method=linear.SolutionMethod.FIELD,
+                substitute=substitute)
+            self.assertEqual(solutions, {x: 1, y: 0, z: 1})
+
+    def test_binary_chain(self):
+        """
+        test substituting through a chain of definitions over GF(2)
+        """
+        x, y, z = map(expression.Variable, ["x", "y", "z"])
+        eq_set = equation.EquationSet.from_equations(
+            x == 1, y == x + 1, z == y + x)
+        solutions = BinaryEngine.solve_equation_set(
+            eq_set, method=linear.SolutionMethod.FIELD)
+        self.assertEqual(solutions, {x: 1, y: 0, z: 1})
+
+    def test_singular_in_field(self):
+        """
+        test that a system singular only over GF(2) cannot be solved in it
+        """
+        x, y = map(expression.Variable, ["x", "y"])
+        eq_set = equation.EquationSet.from_equations(x + y == 1, x - y == 1)
+        self.assertEqual(
+            SeptenaryEngine.solve_equation_set(
+                eq_set, method=linear.SolutionMethod.FIELD), {x: 1, y: 0})
+        with self.assertRaises(ValueError):
+            BinaryEngine.solve_equation_set(
+                eq_set, method=linear.SolutionMethod.FIELD)
+
+    def test_unrepresentable_coefficient(self):
+        """
+        test that coefficients with no representation in GF(7) are named
+        """
+        x, y = map(expression.Variable, ["x", "y"])
+        eq_set = equation.EquationSet.from_equations(
+            x / 7 + y == 1, x - y == 0)
+        with self.assertRaisesRegex(ValueError, "coefficient 1/7 of x"):
+            SeptenaryEngine.solve_equation_set(
+                eq_set, method=linear.SolutionMethod.FIELD)
+
+
+class MixedPrecisionEquationSolving(LinearEngineTestCase):
+    """
+    Test solving in floating point with exact iterative refinement
+    """
+
+    def setUp(self):
+        self.x, self.y, self.z = map(expression.Variable, ["x", "y", "z"])
+        x, y, z = self.x, self.y, self.z
+        self.eq_set = equation.EquationSet.from_equations(
+            x == 5 - 3 * y + 2 * z,
+            x == ((7 - 5 * y - 6 * z) / 3),
+            x == ((8 - 4 * y - 3 * z) / 7), )
+
+    def test_rationalized(self):
+        """
+        test that exact rational solutions are recovered
+        """
+        solutions = linear.LinearEngine.solve_equation_set(
+            self.eq_set, method=linear.SolutionMethod.MIXED_PRECISION)
+        self.assertEqual(solutions,
+                         linear.LinearEngine.solve_equation_set(
+                             self.eq_set,
+                             method=linear.SolutionMethod.FRACTION_FREE))
+        self.assertIsInstance(solutions[self.x], Fraction)
+
+    def test_singular_or_not_square(self):
+        """
+        test that singular and non-square systems are rejected like NUMPY
+        """
+        from numpy.linalg import LinAlgError
+        x, y = self.x, self.y
+        singular = equation.EquationSet.from_equations(
+            x + y == 1, 2 * x + 2 * y == 2)
+        not_square = equation.EquationSet.from_equations(
+            x == 1, y == 2, x + y == 3)
+        for eq_set in (singular, not_square):
+            with self.assertRaises(LinAlgError):
+                linear.LinearEngine.solve_equation_set(
+                    eq_set, method=linear.SolutionMethod.MIXED_PRECISION)
+
+    def test_not_rationalized(self):
+        """
+        test refining without rationalizing the solution
+        """
+        system = linear.LinearEngine.compile_equation_set(self.eq_set)
+        solutions = system.solve_mixed_precision(
+            dtype='float32', rationalize=False)
+        exact = system.solve(linear.SolutionMethod.FRACTION_FREE)
+        for variable, value in solutions.items():
+            self.assertIsInstance(value, float)
+            self.assertAlmostEqual(value, exact[variable], places=12)
+
+
+class SparseEquationSolving(LinearEngineTestCase):
+    """
+    Test linear equation solving with the sparse solver
+    """
+
+    def test_medium_equation(self):
+        """
+        medium complexity test of sparse linear equation solving
+        """
+        x, y, z = map(expression.Variable, ["x", "y", "z"])
+        eq_set = equation.EquationSet.from_equations(
+            x == 5 - 3 * y + 2 * z,
+            x == ((7 - 5 * y - 6 * z) / 3),
+            x == ((8 - 4 * y - 3 * z) / 2), )
+        solutions = linear.LinearEngine.solve_equation_set(
+            eq_set, method=linear.SolutionMethod.SPARSE)
+        for variable, value in {x: -15, y: 8, z: 2}.items():
+            self.assertAlmostEqual(solutions[variable], value)
+
+    def test_chain(self):
+        """
+        test a long chain of equations with few terms per equation
+        """
+        variables = [expression.Variable("x{}".format(i)) for i in range(200)]
+        eq_set = equation.EquationSet([variables[0] == 1] + [
+            right == left + 1 for left, right in zip(variables, variables[1:])
+        ])
+        solutions = linear.LinearEngine.solve_equation_set(
+            eq_set, method=linear.SolutionMethod.SPARSE)
+        for index, variable in enumerate(variables):
+            self.assertAlmostEqual(solutions[variable], index + 1)
+
+    def test_singular(self):
+        """
+        test that a singular system raises rather than solving for NaN
+        """
+        from numpy.linalg import LinAlgError
+        x, y = map(expression.Variable, ["x", "y"])
+        eq_set = equation.EquationSet.from_equations(
+            x + y == 1, 2 * x + 2 * y == 2)
+        with self.assertRaises(LinAlgError):
+            linear.LinearEngine.solve_equation_set(
+                eq_set, method=linear.SolutionMethod.SPARSE)
+
+
+class BatchEquationSolving(LinearEngineTestCase):
+    """
+    Test solving a compiled linear system for many constants
+    """
+
+    def setUp(self):
+        self.x, self.y, self.z = map(expression.Variable, ["x", "y", "z"])
+        x, y, z = self.x, self.y, self.z
+        eq_set = equation.EquationSet.from_equations(
+            x == 5 - 3 * y + 2 * z,
+            x == ((7 - 5 * y - 6 * z) / 3),
+            x == ((8 - 4 * y - 3 * z) / 2), )
+        self.system = linear.LinearEngine.compile_equation_set(eq_set)
+        expected = {x: -15, y: 8, z: 2}
+        self.expected = [
+            [expected[variable] for variable in self.system.variables],
+            [2 * expected[variable] for variable in self.system.variables],
+        ]
+
+    def test_exact_batch(self):
+        """
+        test solving a batch of constants exactly
+        """
+        for method in (linear.SolutionMethod.BUILTIN,
+                       linear.SolutionMethod.FRACTION_FREE):
+            factorization = self.system.factorize(method)
+            self.assertEqual(factorization.solve(),
+                             {self.x: -15, self.y: 8, self.z: 2})
+            doubled = [2 * constant for constant in self.system.constants]
+            solutions = factorization.solve_batch(
+                [self.system.constants, doubled])
+            self.assertEqual(solutions, self.expected)
+
+    def test_float_batch(self):
+        """
+        test solving a batch of constants with floating point factorizations
+        """
+        for method in (linear.SolutionMethod.NUMPY,
+                       linear.SolutionMethod.SPARSE):
+            factorization = self.system.factorize(method)
+            doubled = [2 * constant for constant in self.system.constants]
+            solutions = factorization.solve_batch(
+                [self.system.constants, doubled])
+            for actual, expected in zip(solutions, self.expected):
+                for actual_value, expected_value in zip(actual, expected):
+                    self.assertAlmostEqual(actual_value, expected_value)
+
+
+class SolutionVerification(LinearEngineTestCase):
+    """
+    Test verifying and refining solutions of linear systems
+    """
+
+    def setUp(self):
+        self.x, self.y = map(expression.Variable, ["x", "y"])
+        self.eq_set = equation.EquationSet.from_equations(
+            self.x + self.y == 3, self.x - self.y == 1)
+
+    def test_verify(self):
+        """
+        test computing the residuals of exact and inexact solutions
+        """
+        verification = linear.LinearEngine.verify_solution(
+            self.eq_set, {self.x: 2, self.y: 1})
+        self.assertEqual(verification.max_residual, 0)
+        self.assertTrue(verification.satisfied())
+        verification = linear.LinearEngine.verify_solution(
+            self.eq_set, {self.x: 2.5, self.y: 1})
+        self.assertEqual(verification.by_equation, {
+            self.x + self.y == 3: 0.5,
+            self.x - self.y == 1: 0.5,
+        })
+        self.assertAlmostEqual(verification.norm, 2**0.5 / 2)
+        self.assertFalse(verification.satisfied())
+
+    def test_refine(self):
+        """
+        test that refinement recovers from an inaccurate solution
+        """
+        system = linear.LinearEngine.compile_equation_set(self.eq_set)
+        refined = system.refine({self.x: 2.5, self.y: 0})
+        self.assertTrue(system.verify(refined).satisfied())
+
+    def test_solve_verified(self):
+        """
+        test solving with verification enabled
+        """
+        solutions = linear.LinearEngine.solve_equation_set(
+            self.eq_set, verify=True, tolerance=1e-12)
+        self.assertAlmostEqual(solutions[self.x], 2)
+        self.assertAlmostEqual(solutions[self.y], 1)
+
+
+class ComponentDecomposition(LinearEngineTestCase):
+    """
+    Test solving block diagonal systems component by component
+    """
+
+    def setUp(self):
+        self.variables = [
+            expression.Variable("x{}".format(index)) for index in range(30)
+        ]
+        equations = []
+        for index in range(0, 30, 3):
+            x, y, z = self.variables[index:index + 3]
+            equations.extend([
+                x == 5 - 3 * y + 2 * z,
+                x == ((7 - 5 * y - 6 * z) / 3),
+                x == ((8 - 4 * y - 3 * z) / 2),
+            ])
+        self.eq_set = equation.EquationSet(equations)
+        self.expected = dict(zip(self.variables, [-15, 8, 2] * 10))
+
+    def test_components(self):
+        """
+        test that independent subsystems are found
+        """
+        system = linear.LinearEngine.compile_equation_set(self.eq_set)
+        self.assertEqual(len(system.components), 10)
+        for component in system.components:
+            self.assertEqual(component.shape, (3, 3))
+
+    def test_solve_decomposed(self):
+        """
+        test solving each component separately
+        """
+        solutions = linear.LinearEngine.solve_equation_set(
+            self.eq_set, method=linear.SolutionMethod.BUILTIN)
+        self.assertEqual(solutions, self.expected)
+
+    def test_solve_in_parallel(self):
+        """
+        test solving components with an executor
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(4) as executor:
+            solutions = linear.LinearEngine.solve_equation_set(
+                self.eq_set,
+                method=linear.SolutionMethod.FRACTION_FREE,
+                executor=executor)
+        self.assertEqual(solutions, self.expected)
+
+
+class TriangularEquationSolving(LinearEngineTestCase):
+    """
+    Test solving chains of definitions by substitution
+    """
+
+    def test_peel(self):
+        """
+        test splitting a system into chains around its coupled core
+        """
+        x, y, z, a, b = map(expression.Variable, ["x", "y", "z", "a", "b"])
+        system = linear.LinearEngine.compile_equation_set(
+            equation.EquationSet.from_equations(
+                x == 1, y == x + a, a + b == 3, a - b == x, z == y + b))
+        forward, core_rows, core_columns, backward = \
+            system.triangular_structure
+        self.assertEqual([system.variables[column]
+                          for _, column in forward], [x])
+        self.assertEqual({system.variables[column]
+                          for column in core_columns}, {a, b})
+        self.assertEqual(len(core_rows), 2)
+        self.assertEqual({system.variables[column]
+                          for _, column in backward}, {y, z})
+
+    def test_chain(self):
+        """
+        test solving a chain of definitions exactly and in floating point
+        """
+        x, y, z = map(expression.Variable, ["x", "y", "z"])
+        eq_set = equation.EquationSet.from_equations(x=1, y=x, z=y + x)
+        for method in (linear.SolutionMethod.FRACTION_FREE,
+                       linear.SolutionMethod.BUILTIN,
+                       linear.SolutionMethod.NUMPY,
+                       linear.SolutionMethod.SPARSE):
+            self.assertEqual(
+                linear.LinearEngine.solve_equation_set(eq_set, method=method),
+                {x: 1, y: 1, z: 2})
+
+    def test_chain_with_core(self):
+        """
+        test solving definitions which depend on a coupled core
+        """
+        x, y, a, b = map(expression.Variable, ["x", "y", "a", "b"])
+        eq_set = equation.EquationSet.from_equations(
+            x == 2 * a + b, a + b == 3, a - b == 1, y == x / 3)
+        self.assertEqual(
+            linear.LinearEngine.solve_equation_set(
+                eq_set, method=linear.SolutionMethod.FRACTION_FREE),
+            {x: 5, y: Fraction(5, 3), a: 2, b: 1})
+
+
+class CanonicalOrdering(LinearEngineTestCase):
+    """
+    Test that compiled systems do not depend on set iteration order
+    """
+
+    def test_canonical_order(self):
+        """
+        test compiling the same equations added in different orders
+        """
+        x, y, z = map(expression.Variable, ["x", "y", "z"])
+        equations = [x + y == 1, y + z == 2, z - x == 3]
+        first = linear.LinearEngine.compile_equation_set(
+            equation.EquationSet.from_equations(*equations))
+        linear.LinearEngine.compiled_systems.clear()
+        second = linear.LinearEngine.compile_equation_set(
+            equation.EquationSet.from_equations(*reversed(equations)))
+        self.assertIsNot(first, second)
+        self.assertEqual(first.variables, second.variables)
+        self.assertEqual(first.entries, second.entries)
+
+    def test_parsed_once(self):
+        """
+        test that the coefficients parsed while ordering equations are
+        those used to compile them, so that nothing is parsed again
+        """
+        x, y = map(expression.Variable, ["x", "y"])
+        eq_set = equation.EquationSet.from_equations(x + y == 3, x - y == 1)
+        equations, parsed = linear.LinearEngine.canonical_equations(eq_set)
+        self.assertEqual(
+            parsed, list(map(linear.LinearEngine.parse_equation, equations)))
+        linear.LinearEngine.parsed_equations.clear()
+        self.assertEqual(
+            linear.LinearEngine.parse_equation_set(equations, parsed),
+            linear.LinearEngine.parse_equation_set(equations))
+        linear.LinearEngine.parsed_equations.clear()
+        linear.LinearEngine.parse_equation_set(equations, parsed)
+        self.assertEqual(len(linear.LinearEngine.parsed_equations.entries), 0)
+
+    def test_long_chained_equation(self):
+        """
+        test compiling an equation nested deeper than the recursion limit
+        """
+        variables = [
+            expression.Variable("v{}".format(index)) for index in range(1200)
+        ]
+        difference = variables[0]
+        for variable in variables[1:]:
+            difference = difference - variable
+        system = linear.LinearEngine.compile_equation_set(
+            equation.EquationSet.from_equations(difference == 1))
+        self.assertEqual(system.shape, (1, 1200))
+
+    def test_sparse_builtin(self):
+        """
+        test solving a sparse system exactly with the BUILTIN method
+        """
+        variables = [expression.Variable("v{}".format(i)) for i in range(30)]
+        eq_set = equation.EquationSet.from_equations(
+            *(2 * variable - neighbour == 1
+              for variable, neighbour in zip(variables, variables[1:] +
+                                             variables[:1])))
+        solutions = linear.LinearEngine.solve_equation_set(
+            eq_set, method=linear.SolutionMethod.BUILTIN)
+        self.assertEqual(solutions, {variable: 1 for variable in variables})
+
+
+class ParallelEquationSolving(LinearEngineTestCase):
+    """
+    Test solving many equation sets in a process pool
+    """
+
+    def test_solve_many(self):
+        """
+        test solving several unrelated equation sets at once
+        """
+        x, y = map(expression.Variable, ["x", "y"])
+        eq_sets = [
+            equation.EquationSet.from_equations(x + y == total, x - y == 1)
+            for total in range(5)
+        ]
+        eq_sets.append(equation.EquationSet.from_equations(x + y == 2))
+        solutions = linear.LinearEngine.solve_many(
+            eq_sets,
+            method=linear.SolutionMethod.RANK_REVEALING,
+            max_workers=2)
+        for total, solution in enumerate(solutions[:-1]):
+            self.assertEqual(solution, {
+                x: Fraction(total + 1, 2),
+                y: Fraction(total - 1, 2)
+            })
+        self.assertEqual(len(solutions[-1].free_variables), 1)
+        self.assertIn(solutions[-1].free_variables[0], {x, y})
+
+
+class CompiledSystemCaching(LinearEngineTestCase):
+    """
+    Test caching of compiled linear systems
+    """
+
+    def test_lru_eviction(self):
+        """
+        test that the least recently used entries are evicted first
+        """
+        cache = linear.LRUCache(2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertEqual(len(cache), 2)
+
+    def test_cost_eviction(self):
+        """
+        test that the total cost of the entries is bounded
+        """
+        cache = linear.LRUCache(10, maxcost=5)
+        cache.put("a", 1, 2)
+        cache.put("b", 2, 2)
+        cache.put("c", 3, 2)
+        self.assertNotIn("a", cache)
+        self.assertEqual(cache.total_cost, 4)
+        cache.put("d", 4, 6)
+        self.assertNotIn("d", cache)
+        cache.put("b", 5, 1)
+        self.assertEqual(cache.total_cost, 3)
+        cache.clear()
+        self.assertEqual(cache.total_cost, 0)
+
+    def test_constant_types(self):
+        """
+        test that equations differing only in the types of their constants
+        are not confused
+        """
+        x = expression.Variable("x")
+        solutions = linear.LinearEngine.solve_equation_set(
+            equation.EquationSet.from_equations(2 * x == 1),
+            method=linear.SolutionMethod.BUILTIN)
+        self.assertIsInstance(solutions[x], Fraction)
+        solutions = linear.LinearEngine.solve_equation_set(
+            equation.EquationSet.from_equations(2 * x == 1.0),
+            method=linear.SolutionMethod.BUILTIN)
+        self.assertIsInstance(solutions[x], float)
+        self.assertEqual(solutions[x], 0.5)
+
+    def test_solutions_cached_by_options(self):
+        """
+        test that solutions found with different options are cached
+        separately
+        """
+        x, y = map(expression.Variable, ["x", "y"])
+        eq_set = equation.EquationSet.from_equations(x=1, y=x)
+        linear.LinearEngine.compiled_systems.clear()
+        collected_stats = []
+        for substitute in (True, False, True):
+            with deducer.collect_stats() as collected:
+                solutions = linear.LinearEngine.solve_equation_set(
+                    eq_set,
+                    method=linear.SolutionMethod.BUILTIN,
+                    substitute=substitute)
+            self.assertEqual(solutions, {x: 1, y: 1})
+            collected_stats.extend(collected)
+        substituted, eliminated, cached = collected_stats
+        self.assertEqual(substituted.counts['substituted'], 2)
+        self.assertNotIn('substituted', eliminated.counts)
+        self.assertIn('eliminate', eliminated.stages)
+        self.assertNotIn('substituted', cached.counts)
+        self.assertNotIn('eliminate', cached.stages)
+
+    def test_solutions_cached(self):
+        """
+        test that solving an identical system reuses the compiled system
+        """
+        x, y = map(expression.Variable, ["x", "y"])
+        eq_set = equation.EquationSet.from_equations(x=1, y=x)
+        system = linear.LinearEngine.compile_equation_set(eq_set)
+        solutions = linear.LinearEngine.solve_equation_set(
+            set(eq_set), method=linear.SolutionMethod.BUILTIN)
+        self.assertEqual(solutions, {x: 1, y: 1})
+        self.assertIs(
+            linear.LinearEngine.compile_equation_set(set(eq_set)), system)
+
+
+class ParametricEquationSolving(LinearEngineTestCase):
+    """
+    Test solving underdetermined and overdetermined linear systems
+    """
+
+    def test_underdetermined_exact(self):
+        """
+        test that free variables are reported for an underdetermined system
+        """
+        x, y = map(expression.Variable, ["x", "y"])
+        eq_set = equation.EquationSet.from_equations(x + y == 2)
+        solution = linear.LinearEngine.solve_equation_set(
+            eq_set, method=linear.SolutionMethod.RANK_REVEALING)
+        self.assertFalse(solution.determined)
+        self.assertEqual(len(solution.free_variables), 1)
+        for parameter in range(3):
+            values = solution.at(parameter)
+            self.assertEqual(values[x] + values[y], 2)
+
+    def test_underdetermined_least_squares(self):
+        """
+        test the minimum norm solution of an underdetermined system
+        """
+        x, y = map(expression.Variable, ["x", "y"])
+        eq_set = equation.EquationSet.from_equations(x + y == 2)
+        solution = linear.LinearEngine.solve_equation_set(
+            eq_set, method=linear.SolutionMethod.LEAST_SQUARES)
+        self.assertAlmostEqual(solution[x], 1)
+        self.assertAlmostEqual(solution[y], 1)
+        self.assertEqual(len(solution.directions), 1)
+
+    def test_overdetermined(self):
+        """
+        test the least squares solution of an inconsistent system
+        """
+        x, y = map(expression.Variable, ["x", "y"])
+        eq_set = equation.EquationSet.from_equations(x == 1, x == 3, y == x)
+        solution = linear.LinearEngine.solve_equation_set(
+            eq_set, method=linear.SolutionMethod.RANK_REVEALING)
+        self.assertEqual(solution, {x: 2, y: 2})
+        self.assertTrue(solution.determined)
+        solution = linear.LinearEngine.solve_equation_set(
+            eq_set, method=linear.SolutionMethod.LEAST_SQUARES)
+        self.assertAlmostEqual(solution[x], 2)
+        self.assertAlmostEqual(solution[y], 2)
+
+    def test_least_squares_shapes(self):
+        """
+        test least squares solutions of tall and of wide rank deficient
+        systems
+        """
+        x, y, z = map(expression.Variable, ["x", "y", "z"])
+        eq_set = equation.EquationSet.from_equations(
+            *[x + i * y == 1 + 2 * i for i in range(500)])
+        solution = linear.LinearEngine.solve_equation_set(
+            eq_set, method=linear.SolutionMethod.LEAST_SQUARES)
+        self.assertAlmostEqual(solution[x], 1)
+        self.assertAlmostEqual(solution[y], 2)
+        self.assertEqual(solution.directions, [])
+        eq_set = equation.EquationSet.from_equations(
+            x + y + z == 3, 2 * x + 2 * y + 2 * z == 6)
+        solution = linear.LinearEngine.solve_equation_set(
+            eq_set, method=linear.SolutionMethod.LEAST_SQUARES)
+        self.assertEqual(len(solution.directions), 2)
+        for variable in (x, y, z):
+            self.assertAlmostEqual(solution[variable], 1)
+        for direction in solution.directions:
+            self.assertAlmostEqual(sum(direction.values()), 0)
+
+
+class IncrementalEquationSolving(LinearEngineTestCase):
+    """
+    Test solving a linear system as equations are added and discarded
+    """
+
+    def test_add_equations(self):
+        """
+        test that solutions appear as the system becomes determined
+        """
+        x, y, z = map(expression.Variable, ["x", "y", "z"])
+        solver = linear.IncrementalSolver()
+        self.assertEqual(solver.add(x == 5 - 3 * y + 2 * z), set())
+        solver.add(x == ((7 - 5 * y - 6 * z) / 3))
+        self.assertEqual(solver.solutions, {})
+        changed = solver.add(x == ((8 - 4 * y - 3 * z) / 2))
+        self.assertEqual(changed, {x, y, z})
+        self.assertEqual(solver.solutions, {x: -15, y: 8, z: 2})
+
+    def test_discard_equation(self):
+        """
+        test that discarding an equation frees the variables it determined
+        """
+        x, y = map(expression.Variable, ["x", "y"])
+        first, second, third = x == 1, y == x + 1, y == 2
+        solver = linear.IncrementalSolver([first, second, third])
+        self.assertEqual(solver.solutions, {x: 1, y: 2})
+        solver.discard(third)
+        self.assertEqual(solver.solutions, {x: 1, y: 2})
+        solver.discard(first)
+        self.assertEqual(solver.solutions, {})
+        solver.add(y == 5)
+        self.assertEqual(solver.solutions, {x: 4, y: 5})
+
+    def test_inconsistent(self):
+        """
+        test detecting and recovering from inconsistent equations
+        """
+        x = expression.Variable("x")
+        solver = linear.IncrementalSolver([x == 1])
+        conflict = x == 2
+        solver.add(conflict)
+        self.assertFalse(solver.consistent)
+        solver.discard(conflict)
+        self.assertTrue(solver.consistent)
+        self.assertEqual(solver.solutions, {x: 1})
+
 
 class PlanarEngineTestCase(unittest.TestCase):
     """
@@ -147,6 +943,140 @@ class BasicPlanarEquationSolving(PlanarEngineTestCase):
         })
 
 
+class SpatialEngine(linear.PlanarEngine):
+    """
+    A PlanarEngine for systems of vectors with three coordinates
+    """
+    dimension = 3
+    vector_class = matrix.Vector
+
+
+class VectorizedPlanarEquationSolving(PlanarEngineTestCase):
+    """
+    Test solving every coordinate of a system of vector equations together
+    """
+
+    def test_parse_once(self):
+        """
+        test parsing vector equations into scalar coefficients and constant
+        vectors
+        """
+        v1, v2 = map(expression.Variable, ["v1", "v2"])
+        variables, entries, constants = \
+            linear.PlanarEngine.parse_vector_equation_set(
+                [2 * v1 + V(1, 2) == v2 * 3, v1 == V(0, 1)])
+        self.assertEqual(variables, [v1, v2])
+        self.assertEqual(entries, [{0: 2, 1: -3}, {0: 1}])
+        self.assertEqual(constants, [[-1, -2], [0, 1]])
+
+    def test_matches_split(self):
+        """
+        test that vectorized solutions match those of split equations
+        """
+        v1, v2, v3 = map(expression.Variable, ["v1", "v2", "v3"])
+        eq_set = equation.EquationSet.from_equations(
+            v1 == V(5, 1) - 3 * v2 + 2 * v3,
+            v1 == ((V(7, 2) - 5 * v2 - 6 * v3) / 3),
+            v1 == ((V(8, 3) - 4 * v2 - 3 * v3) / 2), )
+        for method in linear.DECOMPOSABLE_METHODS:
+            vectorized = linear.PlanarEngine.solve_equation_set(
+                eq_set, method=method)
+            split = linear.PlanarEngine.solve_equation_set(
+                eq_set, method=method, vectorize=False)
+            self.assertEqual(set(vectorized), {v1, v2, v3})
+            for variable, vector in vectorized.items():
+                self.assertIsInstance(vector, plane.PlaneVector)
+                for actual, expected in zip(vector, split[variable]):
+                    self.assertAlmostEqual(actual, expected)
+
+    def test_options(self):
+        """
+        test that solving options are honored with and without vectorizing
+        and that exact coefficients are eliminated once for every coordinate
+        """
+        v1, v2, v3, v4 = map(expression.Variable, ["v1", "v2", "v3", "v4"])
+        eq_set = equation.EquationSet.from_equations(
+            v1 == V(1, 2),
+            v2 + v3 == v1 + V(2, 3),
+            v2 - v3 == V(1, 1),
+            v4 == V(4, 4), )
+        expected = {v1: PV(1, 2), v2: PV(2, 3), v3: PV(1, 2), v4: PV(4, 4)}
+        for method in linear.DECOMPOSABLE_METHODS:
+            for vectorize in (True, False):
+                for decompose in (True, False):
+                    for substitute in (True, False):
+                        solutions = linear.PlanarEngine.solve_equation_set(
+                            eq_set,
+                            method=method,
+                            vectorize=vectorize,
+                            verify=True,
+                            decompose=decompose,
+                            substitute=substitute)
+                        self.assertEqual(set(solutions), set(expected))
+                        for variable, vector in solutions.items():
+                            for actual, value in zip(vector,
+                                                     expected[variable]):
+                                self.assertAlmostEqual(actual, value)
+        for method in (linear.SolutionMethod.BUILTIN,
+                       linear.SolutionMethod.FRACTION_FREE,
+                       linear.SolutionMethod.FIELD):
+            with deducer.collect_stats() as collected:
+                solutions = linear.PlanarEngine.solve_equation_set(
+                    eq_set, method=method, decompose=False)
+            self.assertEqual(solutions, expected)
+            self.assertEqual(collected[0].counts['substituted'], 2)
+            self.assertEqual(collected[0].counts['core_variables'], 2)
+
+    def test_attributes_fall_back(self):
+        """
+        test that equations of coordinates are still split
+        """
+        v1 = expression.Variable("v1")
+        eq_set = equation.EquationSet.from_equations(v1.x == 1, v1.y == 2)
+        self.assertIsNone(
+            linear.PlanarEngine.compile_vector_equation_set(eq_set))
+        solutions = linear.PlanarEngine.solve_equation_set(
+            eq_set, method=linear.SolutionMethod.BUILTIN)
+        self.assertEqual(solutions, {v1: PV(1, 2)})
+
+    def test_three_dimensions(self):
+        """
+        test solving a system of vectors with three coordinates
+        """
+        v1, v2 = map(expression.Variable, ["v1", "v2"])
+        eq_set = equation.EquationSet.from_equations(
+            v1 + v2 == V(3, 5, 7), v1 - v2 == V(1, 1, 1))
+        solutions = SpatialEngine.solve_equation_set(
+            eq_set, method=linear.SolutionMethod.FRACTION_FREE)
+        self.assertEqual(solutions, {
+            v1: matrix.Vector((2, 3, 4)),
+            v2: matrix.Vector((1, 2, 3))
+        })
+
+    def test_as_array(self):
+        """
+        test returning solutions as a VectorArray
+        """
+        v1, v2 = map(expression.Variable, ["v1", "v2"])
+        eq_set = equation.EquationSet.from_equations(
+            v1 + v2 == V(3, 5), v1 - v2 == V(1, 1))
+        expected = {v1: PV(2, 3), v2: PV(1, 2)}
+        for method in linear.SolutionMethod:
+            for vectorize in (True, False):
+                solutions = linear.PlanarEngine.solve_equation_set(
+                    eq_set, method=method, vectorize=vectorize, as_array=True)
+                self.assertIsInstance(solutions, array.PlaneVectorArray)
+                self.assertEqual(set(solutions), set(expected))
+                for variable, vector in solutions.items():
+                    for actual, value in zip(vector, expected[variable]):
+                        self.assertAlmostEqual(actual, value)
+        solutions = SpatialEngine.solve_equation_set(
+            equation.EquationSet.from_equations(v1 == V(1, 2, 3)),
+            as_array=True)
+        self.assertEqual(solutions[v1], matrix.Vector((1, 2, 3)))
+        self.assertEqual(solutions.to_numpy().shape, (1, 3))
+
+
 class BasicExpressionEvaluation(PlanarEngineTestCase):
     """
     Test PlanarEngine evaluate_expression method
@@ -179,3 +1109,75 @@ class BasicExpressionEvaluation(PlanarEngineTestCase):
         context = {v1: PV(1, 2), v2: PV(3, 4)}
         actual = linear.PlanarEngine.evaluate_expression(opexp, context)
         self.assertEqual(PV(4, 6), actual)
+
+
+class CompiledExpressionEvaluation(PlanarEngineTestCase):
+    """
+    Test PlanarEngine compile_expression and compile_residuals methods
+    """
+
+    def test_matches_evaluate(self):
+        """
+        test that compiled expressions evaluate like evaluate_expression
+        """
+        v1, v2 = map(expression.Variable, ["v1", "v2"])
+        exp = V(v1.x, v2.y) + 2 * v1 - v2 / 2
+        context = {v1: PV(1, 2), v2: PV(3, 4)}
+        compiled = linear.PlanarEngine.compile_expression(exp)
+        self.assertEqual(
+            compiled(context),
+            linear.PlanarEngine.evaluate_expression(exp, context))
+        self.assertEqual(compiled.variables, {v1, v2})
+
+    def test_given_vectors(self):
+        """
+        test that the items of a vector given a value are not evaluated and
+        that subexpressions shared between vectors are evaluated in each
+        """
+        a, b = map(expression.Variable, ["a", "b"])
+        total = a + b
+        first, second = V(total, a), V(a, total)
+        exp = (first + second) * total
+        contexts = [{a: 1, b: 2}, {first: PV(5, 6), a: 1, b: 2},
+                    {first: PV(5, 6), second: PV(7, 8), a: 1, b: 2}]
+        compiled = linear.PlanarEngine.compile_expression(exp)
+        for context in contexts:
+            self.assertEqual(
+                compiled(context),
+                linear.PlanarEngine.evaluate_expression(exp, context))
+        compiled = linear.PlanarEngine.compile_expression(first + second)
+        self.assertEqual(
+            compiled({first: PV(5, 6), second: PV(7, 8)}), PV(12, 14))
+
+    def test_vectorized(self):
+        """
+        test evaluating a compiled expression over arrays of values
+        """
+        from numpy import arange
+        x, y = map(expression.Variable, ["x", "y"])
+        compiled = linear.PlanarEngine.compile_expression(3 * x - y + 1)
+        values = arange(1000.0)
+        actual = compiled({x: values, y: 2 * values})
+        self.assertEqual(list(actual), list(values + 1))
+
+    def test_long_sum(self):
+        """
+        test compiling a sum of too many terms for a single line
+        """
+        variables = [
+            expression.Variable("v{}".format(index)) for index in range(10000)
+        ]
+        compiled = linear.PlanarEngine.compile_expression(
+            expression.sum_of(*variables))
+        self.assertEqual(
+            compiled(dict(zip(variables, range(10000)))), 49995000)
+
+    def test_residuals(self):
+        """
+        test compiling the residuals of an equation set
+        """
+        x, y = map(expression.Variable, ["x", "y"])
+        eq_set = equation.EquationSet.from_equations(x=1, y=x + 1)
+        compiled = linear.PlanarEngine.compile_residuals(eq_set)
+        residuals = dict(zip(compiled.equations, compiled({x: 1, y: 3})))
+        self.assertEqual(residuals, {x == 1: 0, y == x + 1: 1})
@@ -0,0 +1,201 @@
+"""
+Unit tests for the Deducer and Solver interfaces
+"""
+
+import asyncio
+import threading
+import unittest
+
+from pivot.deduction import linear
+from pivot.interface import deducer
+from pivot.interface.shortcuts import V
+from pivot.lexicon import equation
+from pivot.lexicon import expression
+
+
+class CountingEngine(deducer.SolvingEngine):
+    """
+    A SolvingEngine which counts its solves and waits to be released
+    """
+    calls = 0
+    release = threading.Event()
+
+    @classmethod
+    def solve_equation_set(cls, eq_set, **kwargs):
+        cls.calls += 1
+        cls.release.wait(5)
+        return linear.LinearEngine.solve_equation_set(eq_set, **kwargs)
+
+
+class SolverTestCase(unittest.TestCase):
+    """
+    Abstract base class for Solver test cases
+    """
+
+    def setUp(self):
+        self.x, self.y = map(expression.Variable, ["x", "y"])
+        self.eq_set = equation.EquationSet.from_equations(
+            self.x + self.y == 3, self.x - self.y == 1)
+        CountingEngine.calls = 0
+        CountingEngine.release.clear()
+
+
+class EngineDispatch(SolverTestCase):
+    """
+    Test routing statements to registered engines
+    """
+
+    def test_default_engine(self):
+        """
+        test that a Solver uses the LinearEngine by default
+        """
+        solver = deducer.Solver()
+        self.assertEqual(solver.engine_for(self.eq_set), linear.LinearEngine)
+        self.assertEqual(solver.solve(self.eq_set), {self.x: 2, self.y: 1})
+
+    def test_predicate(self):
+        """
+        test that engines are chosen by statement type and predicate
+        """
+        solver = deducer.Solver(engines=[])
+        solver.register(
+            linear.PlanarEngine,
+            statement_type=equation.EquationSet,
+            predicate=lambda eq_set: len(eq_set) > 2)
+        solver.register(linear.LinearEngine, equation.EquationSet)
+        self.assertEqual(solver.engine_for(self.eq_set), linear.LinearEngine)
+        with self.assertRaises(LookupError):
+            solver.engine_for(self.x == 1)
+
+
+class AsyncSolving(SolverTestCase):
+    """
+    Test solving equation sets from an event loop
+    """
+
+    def test_coalescing(self):
+        """
+        test that concurrent requests for one equation set share a solve
+        """
+        solver = deducer.Solver(engines=[CountingEngine])
+
+        async def solve_all():
+            requests = [
+                asyncio.ensure_future(solver.solve_async(self.eq_set))
+                for _ in range(4)
+            ]
+            await asyncio.sleep(0.01)
+            CountingEngine.release.set()
+            return await asyncio.gather(*requests)
+
+        solutions = asyncio.run(solve_all())
+        self.assertEqual(CountingEngine.calls, 1)
+        for solution in solutions:
+            self.assertEqual(solution, {self.x: 2, self.y: 1})
+        self.assertEqual(solver.pending, {})
+
+    def test_overloaded(self):
+        """
+        test that requests beyond the pending limit are rejected
+        """
+        solver = deducer.Solver(engines=[CountingEngine], max_pending=1)
+        other = equation.EquationSet.from_equations(self.x == 1)
+
+        async def solve_both():
+            first = asyncio.ensure_future(solver.solve_async(self.eq_set))
+            await asyncio.sleep(0)
+            try:
+                with self.assertRaises(deducer.SolverOverloaded):
+                    await solver.solve_async(other)
+            finally:
+                CountingEngine.release.set()
+            return await first
+
+        self.assertEqual(asyncio.run(solve_both()), {self.x: 2, self.y: 1})
+
+    def test_limited_across_event_loops(self):
+        """
+        test that a Solver limiting concurrent solves can be used from one
+        event loop after another
+        """
+        solver = deducer.Solver(max_concurrent=1)
+        other = equation.EquationSet.from_equations(self.x == 1)
+
+        async def solve_both():
+            # the second solve waits for the first to release the semaphore
+            return await asyncio.gather(
+                solver.solve_async(self.eq_set), solver.solve_async(other))
+
+        for _ in range(2):
+            self.assertEqual(
+                asyncio.run(solve_both()),
+                [{self.x: 2, self.y: 1}, {self.x: 1}])
+
+
+class StatsCollection(SolverTestCase):
+    """
+    Test gathering stats about the stages of solves
+    """
+
+    def tearDown(self):
+        linear.LinearEngine.compiled_systems.clear()
+
+    def test_collect_stats(self):
+        """
+        test that stats are collected for each solve
+        """
+        linear.LinearEngine.compiled_systems.clear()
+        with deducer.collect_stats() as collected:
+            linear.LinearEngine.solve_equation_set(
+                self.eq_set,
+                method=linear.SolutionMethod.BUILTIN,
+                substitute=False)
+            linear.LinearEngine.solve_equation_set(self.eq_set)
+        self.assertEqual(len(collected), 2)
+        first, second = collected
+        self.assertEqual(first.engine, linear.LinearEngine)
+        self.assertEqual(first.counts['equations'], 2)
+        self.assertEqual(first.counts['variables'], 2)
+        self.assertEqual(first.counts['nonzeros'], 4)
+        self.assertEqual(first.counts['fill_in'], 0)
+        self.assertIn('parse', first.stages)
+        self.assertIn('eliminate', first.stages)
+        self.assertGreaterEqual(first.stages['total'],
+                                first.stages['eliminate'])
+        self.assertEqual(second.counts['cache_hits'], 1)
+        self.assertIn('assemble', second.stages)
+
+    def test_stats_hooks(self):
+        """
+        test that hooks are called with the stats of every solve and that
+        nothing is gathered otherwise
+        """
+        hooked = []
+        deducer.SolvingEngine.register_stats_hook(hooked.append)
+        try:
+            linear.LinearEngine.solve_equation_set(self.eq_set)
+        finally:
+            deducer.SolvingEngine.unregister_stats_hook(hooked.append)
+        self.assertEqual(len(hooked), 1)
+        self.assertEqual(hooked[0].as_dict()['engine'], 'LinearEngine')
+        with linear.LinearEngine.instrumented() as stats:
+            self.assertIsNone(stats)
+
+    def test_stats_hooks_per_engine(self):
+        """
+        test that hooks registered with an engine only see its solves
+        """
+        hooked = []
+        linear.PlanarEngine.register_stats_hook(hooked.append)
+        try:
+            self.assertEqual(linear.LinearEngine.all_stats_hooks(), [])
+            linear.LinearEngine.solve_equation_set(self.eq_set)
+            linear.PlanarEngine.solve_equation_set(
+                equation.EquationSet.from_equations(self.x == V(1, 2)))
+            with self.assertRaises(ValueError):
+                linear.LinearEngine.unregister_stats_hook(hooked.append)
+        finally:
+            linear.PlanarEngine.unregister_stats_hook(hooked.append)
+        self.assertEqual([stats.engine for stats in hooked],
+                         [linear.PlanarEngine])
+        self.assertEqual(linear.PlanarEngine.all_stats_hooks(), [])
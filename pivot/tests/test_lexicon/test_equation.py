@@ -55,3 +55,19 @@ class TestEquationFromDictDef(EquationTestCase):
             equation.Equation(z, 3 * x),
         ])
         self.assertEqual(equationset, expected_set)
+
+
+class TestEquationSetCompile(EquationTestCase):
+    """
+    Test compiling an EquationSet
+    """
+
+    def test_compile_cached(self):
+        """
+        Test that structurally identical equation sets share a compilation
+        """
+        x, y = map(expression.Variable, ["x", "y"])
+        first = equation.EquationSet.from_equations(x=1, y=x + 2)
+        second = equation.EquationSet.from_equations(y=x + 2, x=1)
+        self.assertIs(first.compile(), second.compile())
+        self.assertEqual(first.compile().solve(), {x: 1, y: 3})
@@ -82,3 +82,128 @@ class TestExpressionsComposition(ExpressionTestCase):
         exp = 1 + V(v1.x, v2.y)
         expected_exp = oe('+', 1, V(v1.x, v2.y))
         self.assert_equal(exp, expected_exp)
+
+
+class TestExpressionInterning(ExpressionTestCase):
+    """
+    Test hash-consing of structurally identical expressions
+    """
+
+    def test_identical_expressions_interned(self):
+        """
+        test that structurally identical expressions are the same object
+        """
+        v1, v2 = map(expression.Variable, ["v1", "v2"])
+        assert expression.Variable("v1") is v1
+        assert v1.x is v1.x
+        assert (v1 + v2) / 2 is (v1 + v2) / 2
+        assert V(v1, 1) is V(v1, 1)
+
+    def test_primitive_types_distinct(self):
+        """
+        test that equal primitives of different types are not conflated
+        """
+        v1 = expression.Variable("v1")
+        assert (v1 + 1) is not (v1 + 1.0)
+        assert isinstance((v1 + 1.0).arguments[1], float)
+
+    def test_nested_primitive_types_distinct(self):
+        """
+        test that expressions differing only in the types of nested
+        primitives are distinct and are not reinitialized
+        """
+        v1 = expression.Variable("v1")
+        exact = 2 * (v1 + Fraction(1, 2))
+        inexact = 2 * (v1 + 0.5)
+        assert exact is not inexact
+        assert isinstance(exact.arguments[1].arguments[1], Fraction)
+        assert isinstance(inexact.arguments[1].arguments[1], float)
+        vector = V(v1, 1)
+        assert V(v1, 1.0) is not vector
+        assert isinstance(vector.items[1], int)
+
+    def test_deep_expression_hash(self):
+        """
+        test hashing an expression nested deeper than the recursion limit
+        """
+        variables = [
+            expression.Variable("v{}".format(index)) for index in range(2000)
+        ]
+        difference = variables[0]
+        for variable in variables[1:]:
+            difference = difference - variable
+        assert isinstance(hash(difference), int)
+
+
+class TestExpressionFlattening(ExpressionTestCase):
+    """
+    Test flattening of associative operators into n-ary expressions
+    """
+
+    def test_flatten_sum(self):
+        """
+        test that chained sums become a single n-ary sum
+        """
+        oe = expression.OperationalExpression
+        v1, v2, v3 = map(expression.Variable, ["v1", "v2", "v3"])
+        self.assert_equal(v1 + v2 + v3, oe('+', v1, v2, v3))
+        self.assert_equal(1 + (v1 + v2), oe('+', 1, v1, v2))
+        self.assert_equal(
+            expression.sum_of(v1, v2 + v3, 2), oe('+', v1, v2, v3, 2))
+
+    def test_flatten_product(self):
+        """
+        test that chained products become a single n-ary product
+        """
+        oe = expression.OperationalExpression
+        v1, v2 = map(expression.Variable, ["v1", "v2"])
+        self.assert_equal(2 * v1 * v2, oe('*', 2, v1, v2))
+        self.assert_equal(
+            expression.product_of(v1, v2 + 1), oe('*', v1, oe('+', v2, 1)))
+
+    def test_chained_sum_scales_linearly(self):
+        """
+        test that a sum of 10k terms chained with + is built in linear time
+        """
+        variables = [
+            expression.Variable("v{}".format(index)) for index in range(10000)
+        ]
+        total = variables[0]
+        for variable in variables[1:]:
+            total = total + variable
+        assert len(total.arguments) == 10000
+        assert hash(total) == hash(expression.sum_of(*variables))
+        assert total == expression.sum_of(*variables)
+
+    def test_extended_sums_interned(self):
+        """
+        test that sums built by chaining + are the interned n-ary sums
+        """
+        v1, v2, v3 = map(expression.Variable, ["v1", "v2", "v3"])
+        oe = expression.OperationalExpression
+        assert (v1 + v2 + v3) is (v1 + v2 + v3)
+        assert (v1 + v2 + v3) is oe('+', v1, v2, v3)
+        assert (v1 + v2 + 1.0) is not (v1 + v2 + 1)
+        assert oe('+', v1, v2, v3, 2) is (v1 + v2 + v3 + 2)
+
+    def test_shared_arguments_extended_independently(self):
+        """
+        test that sums extending the same sum keep their own arguments
+        """
+        v1, v2, v3, v4 = map(expression.Variable, ["v1", "v2", "v3", "v4"])
+        base = v1 + v2 + v3
+        first = base + v4
+        second = base + 1
+        assert tuple(base.arguments) == (v1, v2, v3)
+        assert tuple(first.arguments) == (v1, v2, v3, v4)
+        assert tuple(second.arguments) == (v1, v2, v3, 1)
+        assert tuple((first + 2).arguments) == (v1, v2, v3, v4, 2)
+
+    def test_non_associative_not_flattened(self):
+        """
+        test that differences and quotients stay binary
+        """
+        oe = expression.OperationalExpression
+        v1, v2, v3 = map(expression.Variable, ["v1", "v2", "v3"])
+        self.assert_equal(v1 - v2 - v3, oe('-', oe('-', v1, v2), v3))
+        self.assert_equal(v1 / v2 / v3, oe('/', oe('/', v1, v2), v3))
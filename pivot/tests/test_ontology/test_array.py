@@ -0,0 +1,160 @@
+"""
+Unit tests for the array module
+"""
+
+import unittest
+from fractions import Fraction
+
+from pivot.lexicon import expression
+from pivot.ontology import array
+from pivot.ontology import matrix
+from pivot.ontology import plane
+
+
+class ArrayTestCase(unittest.TestCase):
+    """
+    Abstract base class for ArrayVector and ArrayMatrix test cases
+    """
+    pass
+
+
+class TestArrayVector(ArrayTestCase):
+    """
+    Test point-wise operations on array-backed vectors
+    """
+
+    def test_matches_vector(self):
+        """
+        test that operations match those of matrix.Vector
+        """
+        pairs = [([1, 2, 3], [4, 5, 6]), ([1.5, -2.0], [0.5, 4.0]),
+                 ([Fraction(1, 2), 1], [2, Fraction(1, 3)])]
+        for items0, items1 in pairs:
+            vector0, vector1 = matrix.Vector(items0), matrix.Vector(items1)
+            array0, array1 = array.ArrayVector(items0), array.ArrayVector(
+                items1)
+            self.assertEqual(array0 + array1, vector0 + vector1)
+            self.assertEqual(array0 - array1, vector0 - vector1)
+            self.assertEqual(-array0, -vector0)
+            self.assertEqual(array0 / 2, vector0 / 2)
+            self.assertEqual(array0 * 3, vector0 * 3)
+            self.assertEqual(3 * array0, 3 * vector0)
+            self.assertEqual(array0 * array1, vector0 * vector1)
+
+    def test_exact_division(self):
+        """
+        test that dividing integers keeps them exact
+        """
+        vector = array.ArrayVector([2, 3]) / 2
+        self.assertEqual(list(vector), [1, Fraction(3, 2)])
+        self.assertEqual(list(array.ArrayVector([2, 4]) / 2), [1, 2])
+
+    def test_custom_field(self):
+        """
+        test that elements of custom fields are stored as objects
+        """
+        vector = array.ArrayVector([Fraction(1, 2), Fraction(1, 3)])
+        self.assertEqual(vector.data.dtype, object)
+        self.assertEqual(vector * vector, Fraction(13, 36))
+
+
+class TestArrayMatrix(ArrayTestCase):
+    """
+    Test products of array-backed matrices
+    """
+
+    def test_matches_matrix(self):
+        """
+        test that products match those of matrix.Matrix
+        """
+        rows0, rows1 = [[1, 2], [3, 4]], [[Fraction(1, 2), 0], [1, 5]]
+        mat0, mat1 = matrix.Matrix(rows0), matrix.Matrix(rows1)
+        array0, array1 = array.ArrayMatrix(rows0), array.ArrayMatrix(rows1)
+        self.assertEqual(array0 * array1, mat0 * mat1)
+        self.assertEqual(array0 @ array1, mat0 * mat1)
+        self.assertEqual(array0 * mat1, mat0 * mat1)
+        self.assertEqual(mat0 * array1, mat0 * mat1)
+        self.assertEqual(array0.transpose, mat0.transpose)
+        self.assertEqual(array0 + array1, mat0 + mat1)
+
+    def test_vector_products(self):
+        """
+        test matrix-vector and vector-matrix products
+        """
+        mat = array.ArrayMatrix([[1, 2], [3, 4]])
+        vector = array.ArrayVector([1, 1])
+        self.assertEqual(mat * vector, matrix.Vector([3, 7]))
+        self.assertEqual(vector * mat, matrix.Vector([4, 6]))
+        self.assertEqual(matrix.Vector([1, 1]) * mat, matrix.Vector([4, 6]))
+        self.assertEqual(mat * matrix.Vector([1, 1]), matrix.Vector([3, 7]))
+
+    def test_reduced_form(self):
+        """
+        test reducing an array-backed matrix
+        """
+        mat = array.ArrayMatrix([[1, 3, -2, 5], [3, 5, 6, 7], [2, 4, 3, 8]])
+        self.assertEqual([row[-1] for row in mat.reduced_form], [-15, 8, 2])
+
+
+class TestPlaneVectorArray(ArrayTestCase):
+    """
+    Test columnar arrays of plane vectors
+    """
+
+    def setUp(self):
+        self.v1, self.v2 = map(expression.Variable, ["v1", "v2"])
+        self.vectors = array.PlaneVectorArray([self.v1, self.v2],
+                                              [[1.0, 3.0], [2.0, 4.0]])
+
+    def test_indexing(self):
+        """
+        test using the array as a dict of PlaneVectors
+        """
+        vectors = self.vectors
+        self.assertEqual(vectors[self.v2], plane.PlaneVector((3.0, 4.0)))
+        self.assertIsInstance(vectors[self.v1], plane.PlaneVector)
+        self.assertEqual(list(vectors), [self.v1, self.v2])
+        self.assertIn(self.v1, vectors)
+        self.assertIsNone(vectors.get(expression.Variable("v3")))
+        self.assertEqual(vectors, {
+            self.v1: plane.PlaneVector((1.0, 2.0)),
+            self.v2: plane.PlaneVector((3.0, 4.0))
+        })
+        self.assertEqual(list(vectors.x), [1.0, 3.0])
+        self.assertEqual(list(vectors.y), [2.0, 4.0])
+
+    def test_bulk_arithmetic(self):
+        """
+        test arithmetic applied to every vector at once
+        """
+        vectors = self.vectors
+        reordered = array.PlaneVectorArray.from_dict({
+            self.v2: plane.PlaneVector((1.0, 1.0)),
+            self.v1: plane.PlaneVector((0.0, 1.0))
+        })
+        self.assertEqual((vectors + reordered)[self.v1],
+                         plane.PlaneVector((1.0, 3.0)))
+        self.assertEqual((vectors - plane.PlaneVector((1.0, 2.0)))[self.v2],
+                         plane.PlaneVector((2.0, 2.0)))
+        self.assertEqual((2 * vectors / 4)[self.v2],
+                         plane.PlaneVector((1.5, 2.0)))
+        self.assertEqual((-vectors)[self.v1], plane.PlaneVector((-1.0, -2.0)))
+
+    def test_exact_elements(self):
+        """
+        test that Fractions are kept exact
+        """
+        vectors = array.PlaneVectorArray.from_dict({
+            self.v1: plane.PlaneVector((Fraction(1, 2), 1))
+        })
+        self.assertEqual((vectors / 3)[self.v1],
+                         plane.PlaneVector((Fraction(1, 6), Fraction(1, 3))))
+
+    def test_zero_copy_export(self):
+        """
+        test that the exported array shares memory with the vectors
+        """
+        exported = self.vectors.to_numpy()
+        self.assertEqual(exported.tolist(), [[1.0, 2.0], [3.0, 4.0]])
+        exported[0, 0] = 5.0
+        self.assertEqual(self.vectors.x[0], 5.0)
@@ -0,0 +1,137 @@
+"""
+Unit tests for the field module
+"""
+
+import random
+import unittest
+from fractions import Fraction
+
+from pivot.ontology import field
+
+
+class FieldTestCase(unittest.TestCase):
+    """
+    Abstract base class for Field test cases
+    """
+
+    def assertSolves(self, some_field, rows, solutions, p=None):
+        """
+        Assert that solutions satisfy every row of an augmented matrix
+        """
+        for row in rows:
+            total = sum(coefficient * solution
+                        for coefficient, solution in zip(row, solutions))
+            if p is None:
+                self.assertAlmostEqual(total, row[-1])
+            else:
+                self.assertEqual(total % p, row[-1] % p)
+
+
+class TestField(FieldTestCase):
+    """
+    Test the identities, zero tests and elimination kernels of fields
+    """
+
+    def test_identities(self):
+        """
+        test the identities and inverses of each field
+        """
+        for some_field in (field.Field(), field.REALS, field.RATIONALS,
+                           field.PrimeField(7)):
+            self.assertTrue(some_field.is_zero(some_field.zero))
+            self.assertFalse(some_field.is_zero(some_field.one))
+            self.assertEqual(
+                some_field.convert(3 * some_field.inverse(3)), some_field.one)
+        self.assertEqual(field.RATIONALS.divide(1, 2), Fraction(1, 2))
+        self.assertEqual(field.PrimeField(7).divide(1, 2), 4)
+
+    def test_characteristic_two(self):
+        """
+        test that only the additive identity of GF(2) is zero
+        """
+        gf2 = field.PrimeField(2)
+        self.assertTrue(gf2.is_zero(2))
+        self.assertFalse(gf2.is_zero(1))
+        self.assertFalse(gf2.is_zero(-1))
+
+    def test_prime_conversion(self):
+        """
+        test converting rationals into a prime field
+        """
+        gf7 = field.PrimeField(7)
+        self.assertEqual(gf7.convert(Fraction(1, 2)), 4)
+        self.assertEqual(gf7.convert(-1), 6)
+        with self.assertRaises(ValueError):
+            gf7.convert(Fraction(1, 7))
+
+    def test_composite_modulus(self):
+        """
+        test that prime fields cannot be made with composite moduli
+        """
+        for n in (0, 1, 4, 561, 2**61 + 1):
+            with self.assertRaises(ValueError):
+                field.PrimeField(n)
+        self.assertEqual(field.PrimeField(2**61 - 1).p, 2**61 - 1)
+        self.assertEqual([n for n in range(30) if field.is_prime(n)],
+                         [2, 3, 5, 7, 11, 13, 17, 19, 23, 29])
+
+    def test_eliminate(self):
+        """
+        test solving small systems in each field
+        """
+        rows = [[1, 3, -2, 5], [3, 5, 6, 7], [2, 4, 3, 8]]
+        self.assertEqual(field.RATIONALS.eliminate(rows), [-15, 8, 2])
+        self.assertSolves(field.REALS, rows, field.REALS.eliminate(rows))
+        self.assertSolves(field.Field(), rows, field.Field().eliminate(rows))
+        for p in (3, 11, 2**61 - 1):
+            gf = field.PrimeField(p)
+            self.assertSolves(gf, rows, gf.eliminate(rows), p)
+
+    def test_eliminate_columns(self):
+        """
+        test solving for several columns of constants in each field
+        """
+        rows = [[1, 3, -2, 5, 0], [3, 5, 6, 7, 1], [2, 4, 3, 8, 0]]
+        for some_field, p in ((field.Field(), None), (field.REALS, None),
+                              (field.RATIONALS, None),
+                              (field.PrimeField(11), 11)):
+            columns = some_field.eliminate_columns(rows)
+            self.assertEqual(len(columns), 2)
+            for index, solutions in enumerate(columns):
+                self.assertSolves(some_field,
+                                  [row[:3] + [row[3 + index]] for row in rows],
+                                  solutions, p)
+        self.assertEqual(field.RATIONALS.eliminate_columns(rows)[1],
+                         [Fraction(17, 4), Fraction(-7, 4), Fraction(-1, 2)])
+
+    def test_singular(self):
+        """
+        test that systems without a unique solution raise a ValueError
+        """
+        with self.assertRaises(ValueError):
+            field.PrimeField(2).eliminate([[1, 1, 0], [1, -1, 1]])
+        with self.assertRaises(ValueError):
+            field.RATIONALS.eliminate([[1, 2, 3], [2, 4, 6]])
+        with self.assertRaises(ValueError):
+            field.PrimeField(5).eliminate([[1, 2, 3]])
+
+    def test_vectorized_matches_generic(self):
+        """
+        test that vectorized modular elimination matches elimination one
+        element at a time
+        """
+        rng = random.Random(0)
+        for p in (2, 3, 7, 2**61 - 1):
+            gf = field.PrimeField(p)
+            for _ in range(50):
+                size = rng.randint(1, 6)
+                width = size + rng.randint(1, 3)
+                rows = [[rng.randrange(min(p, 5)) for _ in range(width)]
+                        for _ in range(size)]
+                try:
+                    expected = field.Field.eliminate_columns(gf, rows)
+                except ValueError:
+                    with self.assertRaises(ValueError):
+                        gf.eliminate_columns(rows)
+                    continue
+                self.assertEqual(gf.eliminate_columns(rows), expected)
@@ -3,6 +3,7 @@ Unit tests for the matrix module
 """
 
 import unittest
+from fractions import Fraction
 
 from pivot.ontology import matrix
 
@@ -28,3 +29,142 @@ class TestReduction(MatrixTestCase):
                                       [2, 4, 3, 8]])
         self.assertEqual(mat.reduced_form.constants,
                          matrix.Vector([-15, 8, 2]))
+
+    def test_reduce_needs_swap(self):
+        """
+        test row reduction where the leading entry of the first row is zero
+        """
+        mat = matrix.AugmentedMatrix([[0, 1, 2], [1, 0, 3]])
+        self.assertEqual(mat.reduced_form.constants, matrix.Vector([3, 2]))
+
+    def test_reduce_deep(self):
+        """
+        test reducing more rows than the recursion limit would allow
+        """
+        size = 1100
+        rows = [[0] * (size + 1) for _ in range(size)]
+        for index in range(size):
+            rows[index][index] = 1
+            rows[index][-1] = 1
+            if index:
+                rows[index][index - 1] = -1
+        matrix.reduce_rows_in_place(rows)
+        self.assertEqual([row[-1] for row in rows], list(range(1, size + 1)))
+
+    def test_reduce_overdetermined(self):
+        """
+        test reducing only the coefficients of an overdetermined system
+        """
+        rows = [[1, 0, 1], [0, 1, 2], [1, 1, 3]]
+        matrix.reduce_rows_in_place(rows, width=2)
+        self.assertEqual(rows, [[1, 0, 1], [0, 1, 2], [0, 0, 0]])
+        rows = [[1, 0, 1], [0, 1, 2], [1, 1, 4]]
+        with self.assertRaises(ValueError):
+            matrix.reduce_rows_in_place(rows, width=2)
+
+
+class TestFractionFreeSolve(MatrixTestCase):
+    """
+    Test solving an augmented matrix with fraction-free elimination
+    """
+
+    def test_solve_simple(self):
+        """
+        a simple test of fraction-free solving
+        """
+        rows = [[1, 3, -2, 5], [3, 5, 6, 7], [2, 4, 3, 8]]
+        self.assertEqual(matrix.fraction_free_solve(rows), [-15, 8, 2])
+
+    def test_solve_columns(self):
+        """
+        test fraction-free solving for several columns of constants
+        """
+        rows = [[1, 3, -2, 5, 0], [3, 5, 6, 7, 1], [2, 4, 3, 8, 0]]
+        self.assertEqual(
+            matrix.fraction_free_solve_columns(rows),
+            [[-15, 8, 2], [Fraction(17, 4), Fraction(-7, 4),
+                          Fraction(-1, 2)]])
+
+
+class TestSparseSolve(MatrixTestCase):
+    """
+    Test solving sparse systems in a fill-reducing order
+    """
+
+    def test_minimum_degree_order(self):
+        """
+        test that a dense column is not eliminated until it is sparse
+        """
+        rows = [{0: 4, 1: 1, 2: 1, 3: 1}, {0: 1, 1: 2}, {0: 1, 2: 2},
+                {0: 1, 3: 2}]
+        self.assertEqual(matrix.minimum_degree_order(rows, 4), [1, 2, 0, 3])
+
+    def test_solve_simple(self):
+        """
+        a simple test of sparse solving
+        """
+        rows = [{0: 1, 1: 3, 2: -2}, {0: 3, 1: 5, 2: 6}, {0: 2, 1: 4, 2: 3}]
+        order = matrix.minimum_degree_order(rows, 3)
+        self.assertEqual(matrix.sparse_solve(rows, [5, 7, 8], order),
+                         [-15, 8, 2])
+
+    def test_solve_columns(self):
+        """
+        test sparse solving for several columns of constants at once
+        """
+        rows = [{0: 1, 1: 3, 2: -2}, {0: 3, 1: 5, 2: 6}, {0: 2, 1: 4, 2: 3}]
+        order = matrix.minimum_degree_order(rows, 3)
+        self.assertEqual(
+            matrix.sparse_solve_columns(rows, [[5, 7, 8], [0, 1, 0]], order),
+            [[-15, 8, 2], [Fraction(17, 4), Fraction(-7, 4),
+                          Fraction(-1, 2)]])
+
+    def test_solve_singular(self):
+        """
+        test that solving a singular system returns None
+        """
+        rows = [{0: 1, 1: 2}, {0: 2, 1: 4}]
+        order = matrix.minimum_degree_order(rows, 2)
+        self.assertIsNone(matrix.sparse_solve(rows, [1, 2], order))
+
+    def test_symbolic_fill_in(self):
+        """
+        test counting the fill-in of eliminating a dense column first
+        """
+        rows = [{0: 4, 1: 1, 2: 1, 3: 1}, {0: 1, 1: 2}, {0: 1, 2: 2},
+                {0: 1, 3: 2}]
+        self.assertEqual(matrix.symbolic_fill_in(rows, [1, 2, 0, 3]), 0)
+        self.assertEqual(matrix.symbolic_fill_in(rows, [0, 1, 2, 3]), 3)
+
+
+class TestMatrixProducts(MatrixTestCase):
+    """
+    Test multiplying and transposing matrices
+    """
+
+    def test_matrix_product(self):
+        """
+        test multiplying two matrices
+        """
+        mat0 = matrix.Matrix([[1, 2], [3, 4]])
+        mat1 = matrix.Matrix([[1, 0], [0, 1]])
+        self.assertEqual(mat0 * mat1, matrix.Matrix([[1, 2], [3, 4]]))
+        self.assertEqual(mat0 * mat0, matrix.Matrix([[7, 10], [15, 22]]))
+
+    def test_vector_products(self):
+        """
+        test multiplying matrices by vectors and scalars
+        """
+        mat = matrix.Matrix([[1, 2], [3, 4]])
+        self.assertEqual(mat * matrix.Vector([1, 1]), matrix.Vector([3, 7]))
+        self.assertEqual(matrix.Vector([1, 1]) * mat, matrix.Vector([4, 6]))
+        self.assertEqual(2 * mat, matrix.Matrix([[2, 4], [6, 8]]))
+
+    def test_transpose(self):
+        """
+        test transposing a matrix
+        """
+        mat = matrix.Matrix([[1, 2, 3], [4, 5, 6]])
+        self.assertEqual(mat.transpose, matrix.Matrix([[1, 4], [2, 5],
+                                                       [3, 6]]))
+        self.assertEqual(mat.transpose.shape, (3, 2))